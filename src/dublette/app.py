@@ -11,27 +11,16 @@ import datetime
 from dublette.database.input_and_reference_data import (
     load_input_and_reference_data,
     save_csv_input_data,
-    get_prediction_data,
+    get_prediction_relation,
     save_reference_duplicates_to_database,
 )
-from dublette.data.explore import missing_data, column_profile
-from dublette.model.linker_settings import create_duckdb_linker, get_splink_settings
-from dublette.database.connection import get_connection
-from dublette.evaluation.estimating_model_parameter import (
-    blocking_rule_stats,
-    get_linker_comparison_details,
-    cumulative_comparisons_chart,
-    custom_column_profile,
-    write_markdown_report,
-    create_prediction_reference_table,
-    evaluate_prediction_metrics,
-    append_to_markdown_report,
-)
-from dublette.model.train_predict import run_splink_predict, train_splink_model
+from dublette.database.connection import configure_connection, get_connection
 
+# Splink-abhängige Module (dublette.data.explore, dublette.model.*, dublette.evaluation.*) werden erst
+# in den Zweigen importiert, die sie brauchen; reine Import-Aufrufe (--load-data, --load-reference) laden Splink nicht.
 
-OUTPUT_DUCKDB_PATH = "output/splink_data.duckdb"
 OUTPUT_MARKDOWN_PATH = "output/estimating_model_parameter.md"
+OUTPUT_MODEL_PATH = "output/splink_model.json"
 
 
 @click.command()
@@ -77,12 +66,42 @@ OUTPUT_MARKDOWN_PATH = "output/estimating_model_parameter.md"
     help="Trainiere das Splink-Modell (erstellt den Linker)",
     default=False,
 )
+@click.option(
+    "--retrain",
+    is_flag=True,
+    help="Erzwingt das Training, auch wenn Eingabedaten und Settings seit dem letzten Training unverändert sind.",
+    default=False,
+)
+@click.option(
+    "--max-block-size",
+    type=int,
+    default=None,
+    help="Verwirft Blöcke mit mehr als N Datensätzen in allen Blocking Rules (Schutz vor Block-Skew, z.B. häufige Namen).",
+)
 @click.option(
     "--predict",
     is_flag=True,
     help="Führt die Dubletten-Vorhersage mit dem aktuellen Linker aus und speichert die Ergebnisse als Tabelle.",
     default=False,
 )
+@click.option(
+    "--force-refresh",
+    is_flag=True,
+    help="Erzwingt CSV-Import, Normalisierung und Vorhersage, auch wenn deren Eingaben seit dem letzten Lauf unverändert sind.",
+    default=False,
+)
+@click.option(
+    "--threads",
+    type=int,
+    default=None,
+    help="Anzahl der DuckDB-Threads (Standard: alle Kerne).",
+)
+@click.option(
+    "--memory-limit",
+    type=str,
+    default=None,
+    help="Speicherlimit für DuckDB, z.B. '8GB' (Standard: DuckDB-Vorgabe).",
+)
 @click.help_option("--help", "-h")
 def main(
     load_data,
@@ -92,94 +111,136 @@ def main(
     n_nodups,
     explore,
     train,
+    retrain,
+    max_block_size,
     predict,
+    force_refresh,
+    threads,
+    memory_limit,
 ):
     linker = None
     click.echo("🔍 Starting Duplicate Detection System...")
 
     # Validate input combinations
     if not load_data and not load_reference and not train and not explore and not predict:
-        click.echo("❌ Error: Must specify at least one action:")
-        click.echo("   --load-data FILE: Load CSV file")
-        click.echo("   --load-reference FILE: Load reference duplicates")
-        click.echo("   --train: Trainiere das Splink-Modell")
-        click.echo("   --explore: Datenexploration")
-        click.echo("   --predict: Dubletten-Vorhersage ausführen")
+        click.echo(
+            "❌ Error: Must specify at least one action:\n"
+            "   --load-data FILE: Load CSV file\n"
+            "   --load-reference FILE: Load reference duplicates\n"
+            "   --train: Trainiere das Splink-Modell\n"
+            "   --explore: Datenexploration\n"
+            "   --predict: Dubletten-Vorhersage ausführen"
+        )
 
-    # Daten- und Referenz-Import: übersichtliche, redundanzfreie Logik
-    def file_exists(path, label):
-        if not os.path.exists(path):
-            click.echo(f"❌ Error: File not found: {path} [{label}]")
-            return False
-        return True
+    # Gemeinsame DuckDB-Verbindung für den gesamten CLI-Aufruf (Train und Predict teilen sie sich; wird beim Beenden geschlossen)
+    connection = get_connection()
+    configure_connection(connection, threads=threads, memory_limit=memory_limit)
 
+    # Daten- und Referenz-Import: übersichtliche, redundanzfreie Logik
+    # (Existenz der Dateien prüft bereits click.Path(exists=True))
     if load_data and load_reference:
         click.echo("\n📁 === LOADING INPUT AND REFERENCE DATA ===")
-        if not (file_exists(load_data, "Input") and file_exists(load_reference, "Reference")):
-            return
         n_balanced, n_refs = load_input_and_reference_data(
             load_data,
             load_reference,
             n_dups=n_dups,
             n_nodups=n_nodups,
             enhanced_mode=enhanced_normalization,
+            force_refresh=force_refresh,
         )
-        click.echo(f"✅ Loaded and saved balanced company_data: {n_balanced:,} records")
-        click.echo(f"✅ Loaded reference data: {n_refs:,} pairs")
+        click.echo(f"✅ Loaded and saved balanced company_data: {n_balanced:,} records\n✅ Loaded reference data: {n_refs:,} pairs")
     elif load_data:
         click.echo("\n📁 === LOADING CSV INPUT DATA ===")
-        if not file_exists(load_data, "Input"):
-            return
-        count = save_csv_input_data(load_data)
+        count = save_csv_input_data(load_data, force_refresh=force_refresh)
         click.echo(f"✅ Loaded and saved CSV data: {count:,} records")
     elif load_reference:
         click.echo("\n🎯 === LOADING REFERENCE DATA ===")
-        if not file_exists(load_reference, "Reference"):
-            return
         count = save_reference_duplicates_to_database(load_reference)
         click.echo(f"✅ Loaded reference data: {count:,} pairs")
 
     if explore:
+        from splink import DuckDBAPI
+        from dublette.data.explore import missing_data, column_profile
+
         click.echo("\n🔍 === EXPLORING DATA AND CONFIGURATIONS ===")
-        df_data = get_prediction_data()
-        if df_data is None:
+        if get_prediction_relation(connection) is None:
             click.echo("❌ Error: No CSV input data found. Use --load-data first.")
             return
-        missing_data(df_data)
-        column_profile(df_data)
+        # Splink liest company_data direkt über die gemeinsame Verbindung, ohne Umweg über pandas
+        db_api = DuckDBAPI(connection=connection)
+        missing_data("company_data", db_api=db_api)
+        column_profile("company_data", db_api=db_api)
 
     # Trainingslogik am Ende der Funktion, nur ein Block!
     if train:
+        from splink import DuckDBAPI
+        from dublette.model.linker_settings import (
+            create_duckdb_linker,
+            get_splink_settings,
+            count_oversized_block_pairs,
+            count_scored_block_pairs,
+            create_block_size_view,
+        )
+        from dublette.model.train_predict import train_or_load_splink_model
+        from dublette.evaluation.estimating_model_parameter import (
+            blocking_rule_stats,
+            get_linker_comparison_details,
+            cumulative_comparisons_chart,
+            custom_column_profile,
+            write_markdown_report,
+        )
+
         try:
-            connection = get_connection()
-            linker = create_duckdb_linker(table_name="company_data", connection=connection)
+            if max_block_size is not None:
+                filtered_pairs = count_oversized_block_pairs(connection, "company_data", max_block_size)
+                for rule, n_pairs in filtered_pairs.items():
+                    click.echo(f"🚧 Blocking Rule {rule}: {n_pairs:,} Vergleichspaare durch --max-block-size={max_block_size} verworfen.")
+            linker = create_duckdb_linker(
+                table_name="company_data", connection=connection, max_block_size=max_block_size, debug=explore
+            )
             click.echo("🤖 Splink-Linker für Tabelle 'company_data' wurde erstellt.")
 
             # Blocking Rules aus den Settings holen
-            settings = get_splink_settings()
+            settings = get_splink_settings(max_block_size=max_block_size)
             blocking_rules = settings["blocking_rules_to_generate_predictions"]
 
-            # Splink-Modell trainieren
-            train_splink_model(linker, blocking_rules, max_pairs=100000)
+            # Splink-Modell trainieren (oder unverändertes Modell aus dem letzten Lauf laden)
+            linker, trained = train_or_load_splink_model(
+                linker, connection, blocking_rules, OUTPUT_MODEL_PATH, max_pairs=100000, retrain=retrain, debug=explore
+            )
+            if trained:
+                click.echo(f"💾 Trainiertes Modell gespeichert unter {OUTPUT_MODEL_PATH}.")
+            else:
+                click.echo("♻️  Eingabedaten und Settings unverändert – verwende gespeichertes Modell (--retrain erzwingt Training).")
 
-            # 1. Blocking Rule Stats (jetzt mit DataFrame, nicht Linker)
-            df_analysis = get_prediction_data()
-            if df_analysis is None:
+            # 1. Blocking Rule Stats direkt auf company_data (SATZNR als ID-Spalte, kein pandas-Umweg)
+            if get_prediction_relation(connection) is None:
                 click.echo("❌ Error: Keine Input-Daten für Blocking-Analyse gefunden. Bitte zuerst Daten laden.")
                 return
-            # Spalte 'SATZNR' direkt in 'unique_id' umbenennen, falls vorhanden
-            if "SATZNR" in df_analysis.columns:
-                df_analysis = df_analysis.rename(columns={"SATZNR": "unique_id"})
+            # Mit --max-block-size brauchen die Blocking Rules die vorberechneten Blockgrößen-Spalten
+            rules_table = create_block_size_view(connection) if max_block_size is not None else "company_data"
 
-            stats = blocking_rule_stats(df_analysis, blocking_rules, verbose=True)
+            stats = blocking_rule_stats(
+                rules_table,
+                blocking_rules,
+                verbose=True,
+                db_api=DuckDBAPI(connection=connection),
+                unique_id_column_name="SATZNR",
+                # Paare nach Filterbedingungen (inkl. --max-block-size) per Aggregat statt über Splinks Paarerzeugung
+                scored_pair_counts=list(count_scored_block_pairs(connection, "company_data", max_block_size).values()),
+            )
 
             # 2. Cumulative Comparisons Chart für mehrere Blocking Rules (Beispiel)
-            # Nur die tatsächlich verwendeten Blocking Rules analysieren
-            blocking_rules_for_analysis = blocking_rules
-            cumulative_comparisons_chart(df_analysis, blocking_rules_for_analysis)
+            cumulative_comparisons_chart(
+                rules_table, blocking_rules, db_api=DuckDBAPI(connection=connection), unique_id_column_name="SATZNR"
+            )
 
             # 3. Custom Column Profile Chart (Beispiel)
-            custom_column_profile(df_analysis, ["NAME", "VORNAME", "ADRESSZEILE", "POSTLEITZAHL", "ORT"])
+            custom_column_profile(
+                rules_table,
+                ["NAME", "VORNAME", "ADRESSZEILE", "POSTLEITZAHL", "ORT"],
+                db_api=DuckDBAPI(connection=connection),
+            )
 
             # 4. Vergleichs-/Modellparameter Details
             print("\nVergleichs- und Modellparameter (Ausschnitt):")
@@ -192,28 +253,85 @@ def main(
 
     # Dubletten-Vorhersage als eigenen Workflow
     if predict:
+        from dublette.model.linker_settings import create_duckdb_linker
+        from dublette.model.train_predict import predict_or_reuse_predictions
+        from dublette.evaluation.estimating_model_parameter import (
+            create_prediction_reference_table,
+            evaluate_prediction_metrics_for_thresholds,
+            append_sections_to_markdown_report,
+        )
+        from dublette.database.pipeline_state import get_pipeline_fingerprint, get_table_fingerprint
+
         try:
             if linker is None:
-                click.echo("🔗 Kein Linker gefunden. Erstelle zuerst per Train einen Linker...")
-                
-            thresholds = [round(x, 7) for x in [0.5, 0.6, 0.7, 0.99995, 0.99996, 0.99997, 0.99998, 0.99999, 0.999995, 0.9999985, 0.9999999999999, 1]]
-            
+                if not os.path.exists(OUTPUT_MODEL_PATH):
+                    click.echo("🔗 Kein Linker gefunden. Erstelle zuerst per Train einen Linker...")
+                    return
+                linker = create_duckdb_linker(
+                    table_name="company_data", connection=connection, settings=OUTPUT_MODEL_PATH, debug=explore
+                )
+                click.echo(f"🔗 Gespeichertes Modell aus {OUTPUT_MODEL_PATH} geladen.")
+
+            # Gerundet fällt 0.9999999999999 mit 1 zusammen; doppelte Werte nur einmal evaluieren
+            thresholds = list(dict.fromkeys(
+                round(x, 7) for x in [0.5, 0.6, 0.7, 0.99995, 0.99996, 0.99997, 0.99998, 0.99999, 0.999995, 0.9999985, 0.9999999999999, 1]
+            ))
+
             click.echo("🔮 Starte Dubletten-Vorhersage mit Splink...")
-            connection = get_connection()
-            df_pred = run_splink_predict(linker, connection)
-            click.echo(f"✅ Vorhersage abgeschlossen. {len(df_pred)} Dubletten gespeichert in Tabelle 'predicted_duplicates'.")
+            predicted = predict_or_reuse_predictions(linker, connection, force_refresh=force_refresh)
+            # Kennzahlen der Vorhersage in einem Aggregat direkt in DuckDB
+            n_pred, min_prob, max_prob, n_high = connection.execute("""
+                SELECT
+                    COUNT(*),
+                    MIN(match_probability),
+                    MAX(match_probability),
+                    COUNT(*) FILTER (WHERE match_probability >= 0.8)
+                FROM predicted_duplicates
+            """).fetchone()
+            if predicted:
+                click.echo(f"✅ Vorhersage abgeschlossen. {n_pred} Dubletten gespeichert in Tabelle 'predicted_duplicates'.")
+            else:
+                click.echo(
+                    f"♻️  Eingabedaten und Modell unverändert – verwende {n_pred} vorhandene Dubletten aus 'predicted_duplicates' (--force-refresh erzwingt Vorhersage)."
+                )
+            if n_pred:
+                click.echo(
+                    f"📈 match_probability: min={min_prob:.4f}, max={max_prob:.4f}; {n_high} Paare mit match_probability >= 0.8."
+                )
+
+            # Ohne Referenzdaten gibt es nichts zu evaluieren; vorab im Katalog prüfen statt auf den Fehler zu warten
+            has_reference = connection.execute(
+                "SELECT COUNT(*) FROM information_schema.tables WHERE table_name = 'reference_duplicates'"
+            ).fetchone()[0] > 0 and connection.execute("SELECT EXISTS (SELECT 1 FROM reference_duplicates)").fetchone()[0]
+            if not has_reference:
+                click.echo("ℹ️  Keine Referenzdaten vorhanden (--load-reference) – Evaluation wird übersprungen.")
+                return
 
             # Timestamp für diesen Durchlauf erzeugen
             run_timestamp = datetime.datetime.now().isoformat()
 
-            create_prediction_reference_table(OUTPUT_DUCKDB_PATH)
+            # prediction_reference und Metriken hängen nur von Vorhersagen und Referenzdaten ab;
+            # bei unveränderten Eingaben werden Tabelle und Metriken aus dem letzten Lauf wiederverwendet
+            metrics_cache_key = (
+                f"{get_pipeline_fingerprint(connection, 'predict')}|{get_table_fingerprint(connection, 'reference_duplicates')}"
+            )
+            create_prediction_reference_table(connection, fingerprint=metrics_cache_key)
 
             # Evaluation für verschiedene Thresholds
-            for t in thresholds:
-                eval_result = evaluate_prediction_metrics(OUTPUT_DUCKDB_PATH, threshold=t, run_timestamp=run_timestamp)
-                section_title = f"Evaluation der Vorhersage gegen Referenzdaten (Threshold={t})"
-                append_to_markdown_report(eval_result, output_path=OUTPUT_MARKDOWN_PATH, section_title=section_title)
-                click.echo(f"📄 Evaluationsergebnis für Threshold={t} wurde ans Markdown-Report angehängt.")
+            eval_results = evaluate_prediction_metrics_for_thresholds(
+                connection, thresholds, run_timestamp=run_timestamp, cache_key=metrics_cache_key
+            )
+            # Alle Abschnitte mit einem Schreibvorgang anhängen, Statusmeldungen gesammelt ausgeben
+            append_sections_to_markdown_report(
+                [
+                    (f"Evaluation der Vorhersage gegen Referenzdaten (Threshold={t})", eval_result)
+                    for t, eval_result in eval_results.items()
+                ],
+                output_path=OUTPUT_MARKDOWN_PATH,
+            )
+            click.echo(
+                "\n".join(f"📄 Evaluationsergebnis für Threshold={t} wurde ans Markdown-Report angehängt." for t in eval_results)
+            )
         except Exception as e:
             click.echo(f"⚠️  Fehler bei der Dubletten-Vorhersage: {e}")
 
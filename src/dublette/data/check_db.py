@@ -1,42 +1,123 @@
 #!/usr/bin/env python3
 
+import atexit
+import re
+
 import duckdb
 import click
 
 DEFAULT_DB_PATH = "output/splink_data.duckdb"
 
+# Eine Verbindung pro Datenbankpfad, die über alle Aufrufe wiederverwendet und beim Beenden geschlossen wird.
+# Lesende Kommandos öffnen die Datenbank read-only: kein Schreib-Lock, parallel zu anderen Lesern nutzbar
+_CONNECTIONS = {}
+
+
+def _get_connection(db_path, read_only=True):
+    """Gibt die zwischengespeicherte Verbindung zu db_path zurück (schreibend nur, wenn read_only=False)."""
+    con, con_read_only = _CONNECTIONS.get(db_path, (None, None))
+    # Eine schreibende Verbindung kann auch lesen; DuckDB erlaubt pro Prozess nur eine Konfiguration je Datei
+    if con is not None and (con_read_only == read_only or not con_read_only):
+        return con
+    if con is not None:
+        con.close()
+    try:
+        con = duckdb.connect(db_path, read_only=read_only)
+    except duckdb.IOException as e:
+        # read-only legt keine neue Datei an: fehlende oder gesperrte Datenbank als CLI-Fehler melden
+        raise click.ClickException(f"Datenbank '{db_path}' kann nicht geöffnet werden: {e}")
+    _CONNECTIONS[db_path] = (con, read_only)
+    return con
+
+
+def _cursor(db_path, read_only=True):
+    """Gibt einen eigenen Cursor auf der zwischengespeicherten Verbindung zurück (günstig, thread-sicher nutzbar)."""
+    return _get_connection(db_path, read_only=read_only).cursor()
+
+
+@atexit.register
+def _close_connections():
+    for con, _ in _CONNECTIONS.values():
+        con.close()
+    _CONNECTIONS.clear()
+
+
 def list_tables(db_path=DEFAULT_DB_PATH):
-    con = duckdb.connect(db_path)
+    con = _cursor(db_path)
     tables = con.execute("SHOW TABLES").fetchall()
-    con.close()
     return [t[0] for t in tables]
 
 def list_columns(table_name, db_path=DEFAULT_DB_PATH):
-    con = duckdb.connect(db_path)
-    cols = con.execute(f"PRAGMA table_info('{table_name}')").fetchall()
-    con.close()
-    return [c[1] for c in cols]
+    return list_columns_all([table_name], db_path)[table_name]
+
+def list_columns_all(table_names, db_path=DEFAULT_DB_PATH):
+    """Liest die Spalten mehrerer Tabellen mit einer einzigen Katalogabfrage (Tabellenname -> Spaltenliste)."""
+    con = _cursor(db_path)
+    rows = con.execute("""
+        SELECT table_name, column_name FROM duckdb_columns()
+        WHERE table_name = ANY(?)
+        ORDER BY table_name, column_index
+    """, [table_names]).fetchall()
+    columns_by_table = {table_name: [] for table_name in table_names}
+    for table_name, column_name in rows:
+        columns_by_table[table_name].append(column_name)
+    # Jede Tabelle hat mindestens eine Spalte: fehlt eine im Katalog, existiert sie nicht (z.B. Tippfehler)
+    missing = [table_name for table_name, cols in columns_by_table.items() if not cols]
+    if missing:
+        raise click.ClickException(f"Tabelle(n) existieren nicht: {', '.join(missing)}")
+    return columns_by_table
+
+def _quote_table_name(table_name):
+    """Validiert einen Tabellennamen als einfachen Bezeichner und gibt ihn gequotet zurück (DDL/COPY kennen keine Parameter)."""
+    if not re.fullmatch(r"[A-Za-z_][A-Za-z0-9_]*", table_name):
+        raise ValueError(f"Ungültiger Tabellenname: {table_name!r}")
+    return f'"{table_name}"'
+
+def drop_tables(table_names, db_path=DEFAULT_DB_PATH):
+    """Löscht mehrere Tabellen in einer einzigen Transaktion."""
+    quoted_names = [_quote_table_name(table_name) for table_name in table_names]
+    con = _cursor(db_path, read_only=False)
+    con.execute("BEGIN TRANSACTION")
+    try:
+        for quoted_name in quoted_names:
+            con.execute(f"DROP TABLE IF EXISTS {quoted_name}")
+        con.execute("COMMIT")
+    except Exception:
+        con.execute("ROLLBACK")
+        raise
+    for table_name in table_names:
+        click.echo(f"Tabelle '{table_name}' wurde gelöscht.")
 
 def drop_table(table_name, db_path=DEFAULT_DB_PATH):
-    con = duckdb.connect(db_path)
-    con.execute(f"DROP TABLE IF EXISTS {table_name}")
-    con.close()
-    click.echo(f"Tabelle '{table_name}' wurde gelöscht.")
+    drop_tables([table_name], db_path)
+
+def export_table(table_name, output_path, db_path=DEFAULT_DB_PATH):
+    """Exportiert eine Tabelle per DuckDB COPY als Parquet (.parquet) oder CSV (alle anderen Endungen)."""
+    if output_path.lower().endswith(".parquet"):
+        options = "FORMAT PARQUET, COMPRESSION ZSTD"
+    else:
+        options = "FORMAT CSV, HEADER"
+    quoted_name = _quote_table_name(table_name)
+    quoted_path = output_path.replace("'", "''")
+    con = _cursor(db_path)
+    con.execute(f"COPY {quoted_name} TO '{quoted_path}' ({options})")
+    click.echo(f"Tabelle '{table_name}' wurde nach '{output_path}' exportiert.")
 
 def show_last_evaluations(db_path=DEFAULT_DB_PATH, limit=5):
-    con = duckdb.connect(db_path)
+    con = _cursor(db_path)
     try:
-        df = con.execute(f"""
-            SELECT * FROM prediction_evaluation
+        # Kleine Ergebnismenge: Tupel direkt holen statt über einen pandas-DataFrame
+        rows = con.execute("""
+            SELECT run_timestamp, threshold, true_positives, false_positives, false_negatives,
+                   true_negatives, precision, recall, f1_score
+            FROM prediction_evaluation
             ORDER BY run_timestamp DESC, threshold DESC
-            LIMIT {limit}
-        """).fetchdf()
+            LIMIT ?
+        """, [limit]).fetchall()
     except Exception as e:
         click.echo(f"Fehler beim Auslesen der Tabelle prediction_evaluation: {e}")
-        con.close()
         return
-    con.close()
-    if df.empty:
+    if not rows:
         click.echo("Keine Evaluationsergebnisse gefunden.")
         return
     # Ausgabe als Tabelle
@@ -46,17 +127,16 @@ def show_last_evaluations(db_path=DEFAULT_DB_PATH, limit=5):
     ]
     click.echo(" | ".join(header))
     click.echo("-|-|-|-|-|-|-|-|-")
-    for _, row in df.iterrows():
-        click.echo(f"{row['run_timestamp']} | {row['threshold']:.4f} | {row['true_positives']} | {row['false_positives']} | {row['false_negatives']} | {row['true_negatives']} | {row['precision']:.4f} | {row['recall']:.4f} | {row['f1_score']:.4f}")
+    for run_timestamp, threshold, tp, fp, fn, tn, precision, recall, f1_score in rows:
+        click.echo(f"{run_timestamp} | {threshold:.4f} | {tp} | {fp} | {fn} | {tn} | {precision:.4f} | {recall:.4f} | {f1_score:.4f}")
 
 def count_true_negatives(db_path=DEFAULT_DB_PATH):
-    con = duckdb.connect(db_path)
+    con = _cursor(db_path)
     count = con.execute("""
         SELECT COUNT(*) FROM company_data_raw
         WHERE SATZNR NOT IN (SELECT id1 FROM reference_duplicates)
           AND SATZNR NOT IN (SELECT id2 FROM reference_duplicates)
     """).fetchone()[0]
-    con.close()
     return count
 
 @click.group()
@@ -75,19 +155,36 @@ def list(ctx):
         click.echo(f"- {t}")
 
 @cli.command()
-@click.argument('table_name')
+@click.argument('table_names', nargs=-1, required=True)
+@click.pass_context
+def columns(ctx, table_names):
+    for table_name, cols in list_columns_all(table_names, ctx.obj['db_path']).items():
+        click.echo(f"Spalten in '{table_name}':")
+        for c in cols:
+            click.echo(f"- {c}")
+
+@cli.command()
+@click.argument('table_names', nargs=-1, required=True)
 @click.pass_context
-def columns(ctx, table_name):
-    cols = list_columns(table_name, ctx.obj['db_path'])
-    click.echo(f"Spalten in '{table_name}':")
-    for c in cols:
-        click.echo(f"- {c}")
+def drop(ctx, table_names):
+    """Löscht eine oder mehrere Tabellen."""
+    try:
+        drop_tables(table_names, ctx.obj['db_path'])
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint='TABLE_NAMES')
 
 @cli.command()
 @click.argument('table_name')
+@click.argument('output_path')
 @click.pass_context
-def drop(ctx, table_name):
-    drop_table(table_name, ctx.obj['db_path'])
+def export(ctx, table_name, output_path):
+    """Exportiert eine Tabelle, z.B. predicted_duplicates, als Parquet oder CSV."""
+    try:
+        export_table(table_name, output_path, ctx.obj['db_path'])
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint='TABLE_NAME')
+    except duckdb.CatalogException:
+        raise click.BadParameter(f"Tabelle {table_name!r} existiert nicht.", param_hint='TABLE_NAME')
 
 @cli.command()
 @click.pass_context
@@ -4,14 +4,14 @@ from splink.exploratory import completeness_chart, profile_columns
 from splink import DuckDBAPI
 
 
-def missing_data(df):
-    db_api = DuckDBAPI()
+def missing_data(table_or_df, db_api=None):
+    db_api = db_api or DuckDBAPI()
     click.echo("📊 Missing Values")
-    chart = completeness_chart(df, db_api=db_api)
+    chart = completeness_chart(table_or_df, db_api=db_api)
     chart.save("output/completeness_chart.png", format="png")
 
 
-def column_profile(df):
+def column_profile(table_or_df, db_api=None):
     click.echo("📊 Column Profiles")
-    chart = profile_columns(df, db_api=DuckDBAPI())
+    chart = profile_columns(table_or_df, db_api=db_api or DuckDBAPI())
     chart.save("output/column_profiles_chart.png", format="png")
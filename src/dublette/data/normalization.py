@@ -14,10 +14,153 @@ The module is designed to be resource-efficient and doesn't rely on external
 ML models or hardcoded mappings.
 """
 
-import pandas as pd
 import re
 import unicodedata
 
+import pandas as pd
+
+try:
+    import jellyfish
+except ImportError:  # Graceful fallback - keine Abhängigkeit erzwungen
+    jellyfish = None
+
+
+# Ersetzungstabellen und vorkompilierte Regex-Muster werden einmalig beim Import angelegt
+# und von den skalaren sowie den spaltenweisen (Series-)Funktionen gemeinsam verwendet.
+
+# Deutsche Umlaute manuell behandeln (häufigste Fälle)
+# Das ist ressourcenschonend und deckt die wichtigsten deutschen Zeichen ab
+_UMLAUT_REPLACEMENTS = {
+    "Ä": "AE",
+    "Ö": "OE",
+    "Ü": "UE",
+    "ß": "SS",
+    "À": "A",
+    "Á": "A",
+    "Â": "A",
+    "Ã": "A",
+    "È": "E",
+    "É": "E",
+    "Ê": "E",
+    "Ë": "E",
+    "Ì": "I",
+    "Í": "I",
+    "Î": "I",
+    "Ï": "I",
+    "Ò": "O",
+    "Ó": "O",
+    "Ô": "O",
+    "Õ": "O",
+    "Ù": "U",
+    "Ú": "U",
+    "Û": "U",
+    "Ç": "C",
+    "Ñ": "N",
+}
+# Übersetzungstabelle: alle Ersetzungen in einem einzigen Durchlauf über den Text
+_UMLAUT_TABLE = str.maketrans(_UMLAUT_REPLACEMENTS)
+
+# STR. und STRAßE normalisieren
+_STREET_PATTERNS = [
+    (re.compile(r"\bSTR\b\.?"), "STRASSE"),
+    (re.compile(r"\bSTRASSE\b"), "STRASSE"),
+]
+
+# Weitere häufige Abkürzungen in deutschen Adressen
+_ADDRESS_REPLACEMENTS = [
+    (re.compile(r"\bPL\b\.?"), "PLATZ"),
+    (re.compile(r"\bPLZ\b\.?"), "PLATZ"),
+    (re.compile(r"\bALLE\b"), "ALLEE"),
+    (re.compile(r"\bDAMM\b"), "DAMM"),
+    (re.compile(r"\bWEG\b"), "WEG"),
+    (re.compile(r"\bGASSE\b"), "GASSE"),
+    (re.compile(r"\bRING\b"), "RING"),
+    (re.compile(r"\bUFER\b"), "UFER"),
+    (re.compile(r"\bBRUECKE\b"), "BRUECKE"),
+    (re.compile(r"\bTOR\b"), "TOR"),
+    (re.compile(r"\bHOF\b"), "HOF"),
+    (re.compile(r"\bNR\b\.?"), ""),  # Hausnummer-Kennzeichnung entfernen
+    (re.compile(r"\bNUMMER\b"), ""),
+]
+
+# NLP-nahe Erweiterungen für komplexere Adressen
+_ADDRESS_NLP_PATTERNS = [
+    (re.compile(r"(\d+)\s*([A-Z])\b"), r"\1\2"),  # "123 A" -> "123A"
+    (re.compile(r"\bPOSTFACH\b"), "PF"),  # Postfächer
+    (re.compile(r"\bPF\b\.?"), "PF"),
+]
+
+# Häufige phonetische Variationen von Namen normalisieren
+# Basiert auf häufigen deutschen Schreibweisen und Aussprachen
+_NAME_PATTERNS = [
+    (re.compile(r"\bCH\b"), "K"),  # Christian -> Kristian
+    (re.compile(r"\bPH\b"), "F"),  # Philipp -> Filip
+    (re.compile(r"\bTH\b"), "T"),  # Thomas -> Tomas
+    (re.compile(r"\bCK\b"), "K"),  # Dirck -> Dirk
+    (re.compile(r"\bQU\b"), "KW"),  # Quelle -> Kwelle
+    (re.compile(r"\bX\b"), "KS"),  # Alexander -> Aleksander
+    (re.compile(r"\bZ\b"), "S"),  # Franz -> Frans (in einigen Dialekten)
+    (re.compile(r"\bY\b"), "I"),  # Yvonne -> Ivonne
+    (re.compile(r"\bV\b"), "F"),  # Veit -> Feit (phonetisch)
+    (re.compile(r"\bW\b"), "V"),  # Wilhelm -> Vilhelm
+]
+
+# Doppelte Konsonanten reduzieren (häufig bei Namen)
+_DOUBLE_CONSONANT_PATTERN = re.compile(r"([BCDFGHJKLMNPQRSTVWXZ])\1+")
+
+# Häufige Variationen in deutschen Ortsnamen
+_CITY_PATTERNS = [
+    (re.compile(r"\bAM\b"), "A"),  # Frankfurt am Main -> Frankfurt A Main
+    (re.compile(r"\bIM\b"), "I"),  # Weiden in der Oberpfalz
+    (re.compile(r"\bBEI\b"), "B"),  # Neustadt bei Coburg
+    (re.compile(r"\bAN\b"), "A"),  # Rothenburg an der Tauber
+    (re.compile(r"\bAUF\b"), "A"),  # Roth auf der Roth
+    (re.compile(r"\bINS\b"), "I"),  #
+    (re.compile(r"\bUNTER\b"), "U"),  # Bad Reichenhall unter
+    (re.compile(r"\bOBER\b"), "O"),  # Oberammergau
+    (re.compile(r"\bNIEDER\b"), "N"),  # Niederbrechen
+    (re.compile(r"\bGROSS\b"), "G"),  # Grossbottwar
+    (re.compile(r"\bKLEIN\b"), "K"),  # Kleinmachnow
+    (re.compile(r"\bSANKT\b"), "ST"),  # Sankt Augustin -> St Augustin
+    (re.compile(r"\bST\b\.?"), "ST"),  # St. -> ST
+    (re.compile(r"\bBAD\b"), "B"),  # Bad Homburg -> B Homburg
+]
+
+# Datumsformate, die normalize_date nacheinander probiert
+_DATE_PATTERNS = [
+    re.compile(r"(\d{4})-(\d{2})-(\d{2})"),  # YYYY-MM-DD (bereits korrekt)
+    re.compile(r"(\d{2})\.(\d{2})\.(\d{4})"),  # DD.MM.YYYY (deutsch)
+    re.compile(r"(\d{2})/(\d{2})/(\d{4})"),  # DD/MM/YYYY
+    re.compile(r"(\d{4})(\d{2})(\d{2})"),  # YYYYMMDD (ohne Trenner)
+    re.compile(r"(\d{1,2})\.(\d{1,2})\.(\d{4})"),  # D.M.YYYY oder DD.MM.YYYY
+    re.compile(r"(\d{4})/(\d{2})/(\d{2})"),  # YYYY/MM/DD
+]
+
+# Finale Bereinigung (Leerzeichen gehören zu [^A-Z0-9], das zweite Muster deckt beides ab)
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+_NON_ALNUM_PATTERN = re.compile(r"[^A-Z0-9]")
+
+# Kleine Liste häufiger deutscher Städte (nur Großstädte) für das Fuzzy-Matching
+# Bewusst klein gehalten für Performance und Genauigkeit
+_MAJOR_CITIES = (
+    "BERLIN",
+    "HAMBURG",
+    "MUENCHEN",
+    "KOELN",
+    "FRANKFURT",
+    "STUTTGART",
+    "DUESSELDORF",
+    "DORTMUND",
+    "ESSEN",
+    "LEIPZIG",
+    "BREMEN",
+    "DRESDEN",
+    "HANNOVER",
+    "NUERNBERG",
+    "DUISBURG",
+)
+_MAJOR_CITY_SET = frozenset(_MAJOR_CITIES)
+
 
 def normalize_partner_data(
     df: pd.DataFrame,
@@ -26,6 +169,7 @@ def normalize_partner_data(
     phonetic_names: bool = False,
     fuzzy_cities: bool = False,
     nlp_addresses: bool = False,
+    inplace: bool = False,
 ) -> pd.DataFrame:
     """
     Vollständige Normalisierung der Partnerdaten mit optionalen Erweiterungen.
@@ -43,6 +187,7 @@ def normalize_partner_data(
         phonetic_names (bool): Phonetische Algorithmen für Namen
         fuzzy_cities (bool): Fuzzy-Matching für Ortsnamen
         nlp_addresses (bool): NLP-basierte Adresserweiterungen
+        inplace (bool): Spalten direkt im übergebenen DataFrame ersetzen (wenn der Aufrufer das Original nicht mehr braucht)
 
     Returns:
         pd.DataFrame: Normalisiertes DataFrame
@@ -50,7 +195,12 @@ def normalize_partner_data(
     if df is None or df.empty:
         return df
 
-    df_normalized = df.copy()
+    # Beispielwerte vor der Normalisierung merken (bei inplace wird df überschrieben)
+    example_columns = [column for column in ["NAME", "VORNAME", "ORT", "ADRESSZEILE"][:3] if column in df.columns]
+    examples = df.iloc[0][example_columns]
+
+    # Jede Spalte wird ohnehin vollständig ersetzt: eine flache Kopie genügt, damit das Original unverändert bleibt
+    df_normalized = df if inplace else df.copy(deep=False)
 
     # Enhanced mode aktiviert alle Erweiterungen
     if enhanced_mode:
@@ -68,79 +218,75 @@ def normalize_partner_data(
     # Check optional dependencies
     optional_deps = {}
     if phonetic_names or fuzzy_cities:
-        try:
-            import jellyfish
-
-            optional_deps["jellyfish"] = True
+        optional_deps["jellyfish"] = jellyfish is not None
+        if optional_deps["jellyfish"]:
             print("✓ jellyfish verfügbar für phonetische/fuzzy Algorithmen")
-        except ImportError:
-            optional_deps["jellyfish"] = False
-            print("⚠ jellyfish nicht installiert - verwende Standard-Algorithmen")
-
-    # Schritt 1-3: Spezielle Normalisierung nach Spaltentyp
-    for column in df_normalized.columns:
-        print(f"  Normalisiere Spalte: {column}")
-
-        if column in ["NAME"]:
-            if phonetic_names and optional_deps.get("jellyfish", False):
-                df_normalized[column] = df_normalized[column].apply(lambda x: normalize_name_enhanced(x, use_phonetic=True))
-            else:
-                df_normalized[column] = df_normalized[column].apply(normalize_name)
-
-        elif column in ["VORNAME"]:
-            if phonetic_names and optional_deps.get("jellyfish", False):
-                df_normalized[column] = df_normalized[column].apply(lambda x: normalize_name_enhanced(x, use_phonetic=True))
-            else:
-                df_normalized[column] = df_normalized[column].apply(normalize_name)
-
-        elif column in ["ORT"]:
-            if fuzzy_cities and optional_deps.get("jellyfish", False):
-                df_normalized[column] = df_normalized[column].apply(lambda x: normalize_city_enhanced(x, fuzzy_matching=True))
-            else:
-                df_normalized[column] = df_normalized[column].apply(normalize_city)
-
-        elif column in ["ADRESSZEILE"]:
-            if nlp_addresses:
-                df_normalized[column] = df_normalized[column].apply(lambda x: normalize_address_enhanced(x, use_nlp=True))
-            else:
-                df_normalized[column] = df_normalized[column].apply(normalize_address)
-
-        elif column in ["GEBURTSDATUM"]:
-            df_normalized[column] = df_normalized[column].apply(normalize_date)
         else:
-            # Grundlegende Normalisierung für alle anderen Spalten
-            df_normalized[column] = df_normalized[column].apply(normalize_text_basic)
+            print("⚠ jellyfish nicht installiert - verwende Standard-Algorithmen")
 
-    # Schritt 4: Finale Bereinigung für Splink (optional)
+    column_options = {
+        "normalize_for_splink": normalize_for_splink,
+        "use_phonetic": phonetic_names and optional_deps.get("jellyfish", False),
+        "fuzzy_matching": fuzzy_cities and optional_deps.get("jellyfish", False),
+        "use_nlp": nlp_addresses,
+    }
     if normalize_for_splink:
         print("  Finale Bereinigung: Entferne Leerzeichen und Sonderzeichen...")
 
-        for column in df_normalized.columns:
-            if column == "GEBURTSDATUM":
-                # Bei Datum nur Leerzeichen entfernen, Bindestriche behalten
-                df_normalized[column] = df_normalized[column].apply(
-                    lambda x: remove_special_chars_and_spaces(x, preserve_date_chars=True)
-                )
-            else:
-                # Bei allen anderen Spalten: Leerzeichen und Sonderzeichen entfernen
-                df_normalized[column] = df_normalized[column].apply(
-                    lambda x: remove_special_chars_and_spaces(x, preserve_date_chars=False)
-                )
+    # Schritt 1-4 je Spalte
+    for column in df_normalized.columns:
+        print(f"  Normalisiere Spalte: {column}")
+        df_normalized[column] = _normalize_column(column, df_normalized[column], **column_options)
 
     print("Datennormalisierung erfolgreich abgeschlossen!")
 
     # Zeige Beispiele der Normalisierung
     if len(df_normalized) > 0:
         print("\nBeispiele der Normalisierung:")
-        for column in ["NAME", "VORNAME", "ORT", "ADRESSZEILE"][:3]:
-            if column in df_normalized.columns:
-                original = df.iloc[0][column] if not pd.isna(df.iloc[0][column]) else "N/A"
-                normalized = df_normalized.iloc[0][column] if not pd.isna(df_normalized.iloc[0][column]) else "N/A"
-                print(f"  {column}: '{original}' -> '{normalized}'")
+        for column in example_columns:
+            original = examples[column] if not pd.isna(examples[column]) else "N/A"
+            normalized = df_normalized.iloc[0][column] if not pd.isna(df_normalized.iloc[0][column]) else "N/A"
+            print(f"  {column}: '{original}' -> '{normalized}'")
 
     return df_normalized
 
 
+def _normalize_column(
+    column: str,
+    values: pd.Series,
+    normalize_for_splink: bool = True,
+    use_phonetic: bool = False,
+    fuzzy_matching: bool = False,
+    use_nlp: bool = False,
+) -> pd.Series:
+    """
+    Normalisiert eine einzelne Spalte nach ihrem Typ inklusive optionaler finaler Bereinigung.
+    """
+    # Schritt 1-3: Spezielle Normalisierung nach Spaltentyp
+    # Jede Spalte wird als Ganzes (Series.str) verarbeitet statt Zelle für Zelle per apply,
+    # und zwar nur über ihre eindeutigen Werte (Namen, Orte usw. wiederholen sich stark)
+    if column in ["NAME", "VORNAME"]:
+        values = _apply_to_unique_values(values, _normalize_name_series, use_phonetic=use_phonetic)
+    elif column in ["ORT"]:
+        values = _apply_to_unique_values(values, _normalize_city_series, fuzzy_matching=fuzzy_matching)
+    elif column in ["ADRESSZEILE"]:
+        values = _apply_to_unique_values(values, _normalize_address_series, use_nlp=use_nlp)
+    elif column in ["GEBURTSDATUM"]:
+        values = _apply_to_unique_values(values, _normalize_date_series)
+    else:
+        # Grundlegende Normalisierung für alle anderen Spalten
+        values = _apply_to_unique_values(values, _normalize_text_basic_series)
+
+    # Schritt 4: Finale Bereinigung für Splink (optional)
+    # Bei Datum nur Leerzeichen entfernen, Bindestriche behalten;
+    # bei allen anderen Spalten: Leerzeichen und Sonderzeichen entfernen
+    if normalize_for_splink:
+        values = _apply_to_unique_values(
+            values, _remove_special_chars_and_spaces_series, preserve_date_chars=(column == "GEBURTSDATUM")
+        )
+    return values
+
+
 def normalize_text_basic(text: str) -> str:
     """
     Grundlegende Textnormalisierung ohne externe Modelle.
@@ -168,38 +314,7 @@ def normalize_text_basic(text: str) -> str:
     # 3. Unicode-Normalisierung für deutsche Zeichen
     text = unicodedata.normalize("NFD", text)
 
-    # Deutsche Umlaute manuell behandeln (häufigste Fälle)
-    # Das ist ressourcenschonend und deckt die wichtigsten deutschen Zeichen ab
-    replacements = {
-        "Ä": "AE",
-        "Ö": "OE",
-        "Ü": "UE",
-        "ß": "SS",
-        "À": "A",
-        "Á": "A",
-        "Â": "A",
-        "Ã": "A",
-        "È": "E",
-        "É": "E",
-        "Ê": "E",
-        "Ë": "E",
-        "Ì": "I",
-        "Í": "I",
-        "Î": "I",
-        "Ï": "I",
-        "Ò": "O",
-        "Ó": "O",
-        "Ô": "O",
-        "Õ": "O",
-        "Ù": "U",
-        "Ú": "U",
-        "Û": "U",
-        "Ç": "C",
-        "Ñ": "N",
-    }
-
-    for old, new in replacements.items():
-        text = text.replace(old, new)
+    text = text.translate(_UMLAUT_TABLE)
 
     return text
 
@@ -224,12 +339,10 @@ def remove_special_chars_and_spaces(text: str, preserve_date_chars: bool = False
 
     if preserve_date_chars:
         # Nur Leerzeichen entfernen, Datums-Sonderzeichen (Bindestriche) behalten
-        text = re.sub(r"\s+", "", text)
+        text = _WHITESPACE_PATTERN.sub("", text)
     else:
-        # Alle Leerzeichen entfernen
-        text = re.sub(r"\s+", "", text)
-        # Sonderzeichen entfernen (nur Buchstaben und Zahlen behalten)
-        text = re.sub(r"[^A-Z0-9]", "", text)
+        # Leerzeichen und Sonderzeichen in einem Durchlauf entfernen (nur Buchstaben und Zahlen behalten)
+        text = _NON_ALNUM_PATTERN.sub("", text)
 
     return text
 
@@ -253,29 +366,12 @@ def normalize_address(address: str) -> str:
 
     address = normalize_text_basic(address)
 
-    # 4. STR. und STRAßE normalisieren
-    address = re.sub(r"\bSTR\b\.?", "STRASSE", address)
-    address = re.sub(r"\bSTRASSE\b", "STRASSE", address)
-
-    # Weitere häufige Abkürzungen in deutschen Adressen
-    address_replacements = {
-        r"\bPL\b\.?": "PLATZ",
-        r"\bPLZ\b\.?": "PLATZ",
-        r"\bALLE\b": "ALLEE",
-        r"\bDAMM\b": "DAMM",
-        r"\bWEG\b": "WEG",
-        r"\bGASSE\b": "GASSE",
-        r"\bRING\b": "RING",
-        r"\bUFER\b": "UFER",
-        r"\bBRUECKE\b": "BRUECKE",
-        r"\bTOR\b": "TOR",
-        r"\bHOF\b": "HOF",
-        r"\bNR\b\.?": "",  # Hausnummer-Kennzeichnung entfernen
-        r"\bNUMMER\b": "",
-    }
+    # 4. STR. und STRAßE normalisieren, weitere Abkürzungen auflösen
+    for pattern, replacement in _STREET_PATTERNS:
+        address = pattern.sub(replacement, address)
 
-    for pattern, replacement in address_replacements.items():
-        address = re.sub(pattern, replacement, address)
+    for pattern, replacement in _ADDRESS_REPLACEMENTS:
+        address = pattern.sub(replacement, address)
 
     return address
 
@@ -298,26 +394,11 @@ def normalize_name(name: str) -> str:
 
     name = normalize_text_basic(name)
 
-    # Häufige phonetische Variationen von Namen normalisieren
-    # Basiert auf häufigen deutschen Schreibweisen und Aussprachen
-    name_patterns = {
-        r"\bCH\b": "K",  # Christian -> Kristian
-        r"\bPH\b": "F",  # Philipp -> Filip
-        r"\bTH\b": "T",  # Thomas -> Tomas
-        r"\bCK\b": "K",  # Dirck -> Dirk
-        r"\bQU\b": "KW",  # Quelle -> Kwelle
-        r"\bX\b": "KS",  # Alexander -> Aleksander
-        r"\bZ\b": "S",  # Franz -> Frans (in einigen Dialekten)
-        r"\bY\b": "I",  # Yvonne -> Ivonne
-        r"\bV\b": "F",  # Veit -> Feit (phonetisch)
-        r"\bW\b": "V",  # Wilhelm -> Vilhelm
-    }
-
-    for pattern, replacement in name_patterns.items():
-        name = re.sub(pattern, replacement, name)
+    for pattern, replacement in _NAME_PATTERNS:
+        name = pattern.sub(replacement, name)
 
     # Doppelte Konsonanten reduzieren (häufig bei Namen)
-    name = re.sub(r"([BCDFGHJKLMNPQRSTVWXZ])\1+", r"\1", name)
+    name = _DOUBLE_CONSONANT_PATTERN.sub(r"\1", name)
 
     return name
 
@@ -339,26 +420,8 @@ def normalize_city(city: str) -> str:
 
     city = normalize_text_basic(city)
 
-    # Häufige Variationen in deutschen Ortsnamen
-    city_patterns = {
-        r"\bAM\b": "A",  # Frankfurt am Main -> Frankfurt A Main
-        r"\bIM\b": "I",  # Weiden in der Oberpfalz
-        r"\bBEI\b": "B",  # Neustadt bei Coburg
-        r"\bAN\b": "A",  # Rothenburg an der Tauber
-        r"\bAUF\b": "A",  # Roth auf der Roth
-        r"\bINS\b": "I",  #
-        r"\bUNTER\b": "U",  # Bad Reichenhall unter
-        r"\bOBER\b": "O",  # Oberammergau
-        r"\bNIEDER\b": "N",  # Niederbrechen
-        r"\bGROSS\b": "G",  # Grossbottwar
-        r"\bKLEIN\b": "K",  # Kleinmachnow
-        r"\bSANKT\b": "ST",  # Sankt Augustin -> St Augustin
-        r"\bST\b\.?": "ST",  # St. -> ST
-        r"\bBAD\b": "B",  # Bad Homburg -> B Homburg
-    }
-
-    for pattern, replacement in city_patterns.items():
-        city = re.sub(pattern, replacement, city)
+    for pattern, replacement in _CITY_PATTERNS:
+        city = pattern.sub(replacement, city)
 
     return city
 
@@ -381,17 +444,8 @@ def normalize_date(date_str: str) -> str:
     date_str = str(date_str).strip()
 
     # Versuche verschiedene Datumsformate zu parsen
-    date_patterns = [
-        r"(\d{4})-(\d{2})-(\d{2})",  # YYYY-MM-DD (bereits korrekt)
-        r"(\d{2})\.(\d{2})\.(\d{4})",  # DD.MM.YYYY (deutsch)
-        r"(\d{2})/(\d{2})/(\d{4})",  # DD/MM/YYYY
-        r"(\d{4})(\d{2})(\d{2})",  # YYYYMMDD (ohne Trenner)
-        r"(\d{1,2})\.(\d{1,2})\.(\d{4})",  # D.M.YYYY oder DD.MM.YYYY
-        r"(\d{4})/(\d{2})/(\d{2})",  # YYYY/MM/DD
-    ]
-
-    for pattern in date_patterns:
-        match = re.search(pattern, date_str)
+    for pattern in _DATE_PATTERNS:
+        match = pattern.search(date_str)
         if match:
             groups = match.groups()
             if len(groups) == 3:
@@ -435,16 +489,15 @@ def normalize_name_enhanced(name: str, use_phonetic: bool = False) -> str:
 
     # Optional: Phonetische Erweiterung
     if use_phonetic:
-        try:
-            import jellyfish
-
-            # Soundex für deutsche Namen - robuster als Metaphone
-            phonetic_code = jellyfish.soundex(name)
-            # Kombiniere beide für beste Ergebnisse
-            return f"{name}_{phonetic_code}" if phonetic_code else name
-        except ImportError:
+        if jellyfish is None:
             # Graceful fallback - keine Abhängigkeit erzwungen
             print("  Hinweis: jellyfish nicht installiert, verwende Standard-Normalisierung")
+            return name
+
+        # Soundex für deutsche Namen - robuster als Metaphone
+        phonetic_code = jellyfish.soundex(name)
+        # Kombiniere beide für beste Ergebnisse
+        return f"{name}_{phonetic_code}" if phonetic_code else name
 
     return name
 
@@ -468,44 +521,11 @@ def normalize_city_enhanced(city: str, fuzzy_matching: bool = False) -> str:
 
     # Optional: Fuzzy-Matching gegen bekannte deutsche Städte
     if fuzzy_matching:
-        try:
-            import jellyfish
-
-            # Kleine Liste häufiger deutscher Städte (nur Großstädte)
-            # Bewusst klein gehalten für Performance und Genauigkeit
-            major_cities = {
-                "BERLIN",
-                "HAMBURG",
-                "MUENCHEN",
-                "KOELN",
-                "FRANKFURT",
-                "STUTTGART",
-                "DUESSELDORF",
-                "DORTMUND",
-                "ESSEN",
-                "LEIPZIG",
-                "BREMEN",
-                "DRESDEN",
-                "HANNOVER",
-                "NUERNBERG",
-                "DUISBURG",
-            }
-
-            best_match = None
-            best_score = 0
-
-            for ref_city in major_cities:
-                score = jellyfish.jaro_winkler_similarity(city, ref_city)
-                if score > best_score and score > 0.85:  # Hoher Threshold für Genauigkeit
-                    best_score = score
-                    best_match = ref_city
-
-            if best_match:
-                # print(f"    Fuzzy-Match: '{city}' -> '{best_match}' (Score: {best_score:.2f})")
-                return best_match
-
-        except ImportError:
+        if jellyfish is None:
             print("  Hinweis: jellyfish nicht installiert, verwende Standard-Normalisierung")
+            return city
+        try:
+            return _match_major_city(city)
         except Exception as e:
             print(f"  Hinweis: Fuzzy-Matching fehlgeschlagen ({e}), verwende Standard-Normalisierung")
 
@@ -532,12 +552,8 @@ def normalize_address_enhanced(address: str, use_nlp: bool = False) -> str:
             # Hier könnte spaCy oder andere NLP-Tools integriert werden
             # Für jetzt: Zusätzliche Regex-Patterns für komplexere Fälle
 
-            # Hausnummern normalisieren
-            address = re.sub(r"(\d+)\s*([A-Z])\b", r"\1\2", address)  # "123 A" -> "123A"
-
-            # Postfächer
-            address = re.sub(r"\bPOSTFACH\b", "PF", address)
-            address = re.sub(r"\bPF\b\.?", "PF", address)
+            for pattern, replacement in _ADDRESS_NLP_PATTERNS:
+                address = pattern.sub(replacement, address)
 
         except Exception as e:
             print(f"  Hinweis: Erweiterte Adressnormalisierung fehlgeschlagen ({e})")
@@ -545,6 +561,140 @@ def normalize_address_enhanced(address: str, use_nlp: bool = False) -> str:
     return address
 
 
+def _match_major_city(city: str) -> str:
+    """
+    Gleicht einen bereits normalisierten Ortsnamen per Jaro-Winkler gegen die Liste
+    der Großstädte ab und liefert den besten Treffer oder den Ortsnamen unverändert.
+    """
+    # Exakter Treffer: Jaro-Winkler 1.0 kann von keiner anderen Stadt übertroffen werden
+    if city in _MAJOR_CITY_SET:
+        return city
+
+    best_match = None
+    best_score = 0
+
+    for ref_city in _MAJOR_CITIES:
+        score = jellyfish.jaro_winkler_similarity(city, ref_city)
+        if score > best_score and score > 0.85:  # Hoher Threshold für Genauigkeit
+            best_score = score
+            best_match = ref_city
+
+    # print(f"    Fuzzy-Match: '{city}' -> '{best_match}' (Score: {best_score:.2f})")
+    return best_match if best_match else city
+
+
+def _apply_to_unique_values(values: pd.Series, normalize_func, **kwargs) -> pd.Series:
+    """
+    Wendet eine spaltenweise Normalisierung nur auf die eindeutigen Werte einer Spalte an
+    und verteilt die Ergebnisse anschließend über die Codes aus pd.factorize auf alle Zeilen.
+    Funktioniert auch für kategorische Spalten (es werden nur die vorkommenden Kategorien normalisiert).
+    """
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    normalized = normalize_func(pd.Series(uniques), **kwargs).to_numpy(dtype=object)
+    return pd.Series(normalized[codes], index=values.index, name=values.name)
+
+
+def _as_text_series(values: pd.Series) -> pd.Series:
+    """Fehlende Werte werden zu "", alle übrigen Werte zu str (wie in den skalaren Funktionen)."""
+    return values.astype(object).where(values.notna(), "").astype(str)
+
+
+def _normalize_text_basic_series(values: pd.Series) -> pd.Series:
+    """Spaltenweise Variante von normalize_text_basic."""
+    return _as_text_series(values).str.upper().str.strip().str.normalize("NFD").str.translate(_UMLAUT_TABLE)
+
+
+def _replace_patterns_series(text: pd.Series, patterns: list) -> pd.Series:
+    """Wendet alle vorkompilierten Regex-Ersetzungen nacheinander auf die ganze Spalte an."""
+    for pattern, replacement in patterns:
+        text = text.str.replace(pattern, replacement, regex=True)
+    return text
+
+
+def _normalize_address_series(values: pd.Series, use_nlp: bool = False) -> pd.Series:
+    """Spaltenweise Variante von normalize_address bzw. normalize_address_enhanced."""
+    address = _normalize_text_basic_series(values)
+    address = _replace_patterns_series(address, _STREET_PATTERNS)
+    address = _replace_patterns_series(address, _ADDRESS_REPLACEMENTS)
+    if use_nlp:
+        address = _replace_patterns_series(address, _ADDRESS_NLP_PATTERNS)
+    return address
+
+
+def _normalize_name_series(values: pd.Series, use_phonetic: bool = False) -> pd.Series:
+    """Spaltenweise Variante von normalize_name bzw. normalize_name_enhanced."""
+    name = _normalize_text_basic_series(values)
+    name = _replace_patterns_series(name, _NAME_PATTERNS)
+    name = name.str.replace(_DOUBLE_CONSONANT_PATTERN, r"\1", regex=True)
+    if use_phonetic:
+        if jellyfish is None:
+            print("  Hinweis: jellyfish nicht installiert, verwende Standard-Normalisierung")
+            return name
+        # Soundex anhängen, sofern ein Code berechnet werden konnte
+        phonetic_code = name.map(jellyfish.soundex)
+        name = name.where(phonetic_code == "", name + "_" + phonetic_code)
+    return name
+
+
+def _normalize_city_series(values: pd.Series, fuzzy_matching: bool = False) -> pd.Series:
+    """Spaltenweise Variante von normalize_city bzw. normalize_city_enhanced."""
+    city = _replace_patterns_series(_normalize_text_basic_series(values), _CITY_PATTERNS)
+    if fuzzy_matching:
+        if jellyfish is None:
+            print("  Hinweis: jellyfish nicht installiert, verwende Standard-Normalisierung")
+            return city
+        try:
+            city = city.map(_match_major_city)
+        except Exception as e:
+            print(f"  Hinweis: Fuzzy-Matching fehlgeschlagen ({e}), verwende Standard-Normalisierung")
+    return city
+
+
+def _normalize_date_series(values: pd.Series) -> pd.Series:
+    """
+    Spaltenweise Variante von normalize_date.
+
+    Probiert die Datumsformate in derselben Reihenfolge wie normalize_date, allerdings je
+    Format einmal über die ganze Spalte (Series.str.extract) statt Wert für Wert. Werte,
+    für die kein Format ein plausibles Datum liefert, bleiben (getrimmt) erhalten.
+    """
+    # Nur Leerzeichen trimmen, Sonderzeichen beibehalten
+    date_str = _as_text_series(values).str.strip()
+    result = date_str.copy()
+    unresolved = pd.Series(True, index=date_str.index)
+
+    for pattern in _DATE_PATTERNS:
+        groups = date_str[unresolved].str.extract(pattern)
+        if groups.empty:
+            break
+        # Bestimme Format basierend auf der ersten Gruppe (Jahr zuerst oder Tag zuerst)
+        year_first = groups[0].str.len() == 4
+        year = pd.to_numeric(groups[0].where(year_first, groups[2]))
+        month = pd.to_numeric(groups[1])
+        day = pd.to_numeric(groups[2].where(year_first, groups[0]))
+
+        # Grundlegende Plausibilitätsprüfung
+        valid = month.between(1, 12) & day.between(1, 31) & year.between(1900, 2100)
+        if not valid.any():
+            continue
+        valid_index = valid[valid].index
+        result[valid_index] = (
+            year[valid_index].astype(int).astype(str).str.zfill(4)
+            + "-" + month[valid_index].astype(int).astype(str).str.zfill(2)
+            + "-" + day[valid_index].astype(int).astype(str).str.zfill(2)
+        )
+        unresolved[valid_index] = False
+
+    return result
+
+
+def _remove_special_chars_and_spaces_series(values: pd.Series, preserve_date_chars: bool = False) -> pd.Series:
+    """Spaltenweise Variante von remove_special_chars_and_spaces."""
+    # Leerzeichen sind selbst Sonderzeichen: ohne Datum reicht daher ein einziges Muster
+    pattern = _WHITESPACE_PATTERN if preserve_date_chars else _NON_ALNUM_PATTERN
+    return _as_text_series(values).str.replace(pattern, "", regex=True)
+
+
 def get_normalization_statistics(df_original: pd.DataFrame, df_normalized: pd.DataFrame) -> dict:
     """
     Erstellt Statistiken über die Normalisierung.
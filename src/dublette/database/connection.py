@@ -1,16 +1,58 @@
+import atexit
+import threading
+from pathlib import Path
+
 import duckdb
-import os
+
+# Einmalig beim Import berechnet: Projektwurzel (src/dublette/database -> drei Ebenen höher) und Ausgabeordner
+_PROJECT_ROOT = Path(__file__).resolve().parents[3]
+_OUTPUT_DIR = _PROJECT_ROOT / "output"
 
 
 def get_database_path():
     """Get the path to the persistent DuckDB database file."""
-    project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
-    output_dir = os.path.join(project_root, "output")
-    os.makedirs(output_dir, exist_ok=True)
-    return os.path.join(output_dir, "splink_data.duckdb")
+    _OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    return str(_OUTPUT_DIR / "splink_data.duckdb")
+
+
+_CONNECTION = None
+_CONNECTION_LOCK = threading.Lock()
 
 
 def get_connection():
-    """Get a connection to the DuckDB database."""
-    db_path = get_database_path()
-    return duckdb.connect(database=db_path)
\ No newline at end of file
+    """
+    Get the shared connection to the DuckDB database.
+    Die Verbindung wird beim ersten Aufruf geöffnet und beim Beenden des Prozesses geschlossen;
+    Datei-Header, Katalog und Buffer-Pool bleiben so über alle Schritte eines CLI-Aufrufs erhalten.
+    Funktionen, die auch aus Threads aufgerufen werden, arbeiten mit get_connection().cursor().
+    """
+    global _CONNECTION
+    with _CONNECTION_LOCK:
+        if _CONNECTION is None:
+            _CONNECTION = duckdb.connect(database=get_database_path())
+            atexit.register(_close_connection)
+    return _CONNECTION
+
+
+def _close_connection():
+    """Schließt die gemeinsame Verbindung (atexit)."""
+    global _CONNECTION
+    with _CONNECTION_LOCK:
+        if _CONNECTION is not None:
+            _CONNECTION.close()
+            _CONNECTION = None
+
+def configure_connection(con, threads=None, memory_limit=None):
+    """
+    Setzt DuckDB-Einstellungen für die gesamte Datenbank-Instanz (gelten auch für weitere Verbindungen im Prozess).
+    Args:
+        con: DuckDB-Verbindung
+        threads (int): Optional, Anzahl der Threads (Standard: DuckDB wählt selbst)
+        memory_limit (str): Optional, Speicherlimit, z.B. '8GB' (Standard: DuckDB wählt selbst)
+    """
+    # Reihenfolge der Ergebnisse wird nur dort garantiert, wo ORDER BY steht; erlaubt parallele Pipelines bei Import/Export
+    con.execute("SET preserve_insertion_order = false")
+    if threads is not None:
+        con.execute(f"SET threads = {int(threads)}")
+    if memory_limit is not None:
+        con.execute("SET memory_limit = ?", [memory_limit])
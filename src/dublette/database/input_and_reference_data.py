@@ -1,9 +1,14 @@
 """
 Handles all logic for input data (CSV import, normalization, retrieval) and reference duplicate data (import, storage).
+Alle Funktionen arbeiten auf einem eigenen Cursor der gemeinsamen Verbindung (auch aus Threads);
+con.close() schließt dabei nur den Cursor, nicht die Datenbank.
 """
+from concurrent.futures import ThreadPoolExecutor
+
 import pandas as pd
 import duckdb
 from dublette.database.connection import get_connection
+from dublette.database.pipeline_state import get_file_fingerprint, get_pipeline_fingerprint, set_pipeline_fingerprint
 from dublette.data.normalization import normalize_partner_data
 
 
@@ -26,7 +31,7 @@ def create_balanced_company_data(
     Returns:
         int: Anzahl der Datensätze im balancierten Testset
     """
-    con = get_connection()
+    con = get_connection().cursor()
     # Alle temporären Tabellen zu Beginn droppen
     temp_tables = ["temp_ref_sample", "temp_pos_ids", "temp_positives", "temp_negatives", "temp_balanced", "temp_negatives_sample"]
     drop_tables = lambda con, tables: [con.execute(f"DROP TABLE IF EXISTS {tbl}") for tbl in tables]
@@ -59,58 +64,84 @@ def create_balanced_company_data(
     con.execute("CREATE TABLE temp_balanced AS SELECT * FROM temp_positives UNION ALL SELECT * FROM temp_negatives_sample")
     # Hole die Daten als DataFrame
     df_balanced = con.execute("SELECT * FROM temp_balanced ORDER BY RANDOM()").df()
-    # Normalisiere die Daten
-    df_balanced = df_balanced.map(lambda x: None if isinstance(x, str) and x.strip() == "" else x)
-    df_normalized = normalize_partner_data(df_balanced, enhanced_mode=enhanced_mode)
-    df_normalized = df_normalized.map(lambda x: None if isinstance(x, str) and x.strip() == "" else x)
-    # Speichere als company_data
-    con.execute("DROP TABLE IF EXISTS company_data")
-    con.register("temp_norm", df_normalized)
-    con.execute("CREATE TABLE company_data AS SELECT DISTINCT * FROM temp_norm")
+    # Normalisiere die Daten und speichere sie als company_data
+    df_normalized = normalize_partner_data(df_balanced, enhanced_mode=enhanced_mode, inplace=True)
+    _save_normalized_company_data(con, df_normalized)
     # Am Ende temporäre Tabellen droppen
     drop_tables(con, temp_tables)
+    n_records = con.execute("SELECT COUNT(*) FROM company_data").fetchone()[0]
     con.close()
-    return len(df_balanced)
+    return n_records
+
+
+def _save_normalized_company_data(con, df_normalized):
+    """
+    Schreibt normalisierte Daten als company_data. Leere Werte in Textspalten werden dabei in SQL zu NULL
+    (NULLIF), statt jede Zelle vorher und nachher in Python zu prüfen; Leerzeichen entfernt
+    bereits die Normalisierung.
+    Args:
+        con: DuckDB-Verbindung
+        df_normalized (pd.DataFrame): Ergebnis von normalize_partner_data
+    """
+    con.register("temp_norm", df_normalized)
+    # Nur Textspalten können leer sein; bei INTEGER/DATE-Spalten (z.B. unverändert durchgereichte Frames)
+    # würde NULLIF den Leerstring in den Spaltentyp casten und scheitern
+    temp_norm = con.table("temp_norm")
+    columns = ", ".join(
+        f'NULLIF("{column}", \'\') AS "{column}"' if column_type == duckdb.typing.VARCHAR else f'"{column}"'
+        for column, column_type in zip(temp_norm.columns, temp_norm.types)
+    )
+    con.execute(f"CREATE OR REPLACE TABLE company_data AS SELECT DISTINCT {columns} FROM temp_norm")
+    con.unregister("temp_norm")
 
 
-def create_company_data(n_rows: int, enhanced_mode=False):
+def create_company_data(n_rows: int, enhanced_mode=False, force_refresh=False):
     """
     Liest n_rows Datensätze aus company_data_raw, normalisiert sie und schreibt sie als company_data.
+    Wurde company_data bereits aus derselben Eingabedatei mit denselben Parametern erzeugt, entfällt die Normalisierung.
     Args:
         n_rows (int): Anzahl der zu lesenden Datensätze
         enhanced_mode (bool): Erweiterte Normalisierung
+        force_refresh (bool): Normalisierung auch bei unveränderten Eingaben erzwingen
     Returns:
         int: Anzahl der geschriebenen Datensätze
     """
-    con = get_connection()
+    con = get_connection().cursor()
+    fingerprint = f"{get_pipeline_fingerprint(con, 'load_data')}|{n_rows}|{enhanced_mode}"
+    if not force_refresh and _table_exists(con, "company_data") and get_pipeline_fingerprint(con, "normalize") == fingerprint:
+        n_records = con.execute("SELECT COUNT(*) FROM company_data").fetchone()[0]
+        con.close()
+        return n_records
     # Hole n_rows Zeilen aus company_data_raw
     if n_rows <= 0:
         df = con.execute(f"SELECT * FROM company_data_raw ").df()
     else:
         df = con.execute(f"SELECT * FROM company_data_raw ORDER BY SATZNR LIMIT {n_rows}").df()
-    # Normalisiere die Daten
-    df = df.map(lambda x: None if isinstance(x, str) and x.strip() == "" else x)
-    df_normalized = normalize_partner_data(df, enhanced_mode=enhanced_mode)
-    df_normalized = df_normalized.map(lambda x: None if isinstance(x, str) and x.strip() == "" else x)
-    # Schreibe als company_data
-    con.execute("DROP TABLE IF EXISTS company_data")
-    con.register("temp_norm", df_normalized)
-    con.execute("CREATE TABLE company_data AS SELECT DISTINCT * FROM temp_norm")
+    # Normalisiere die Daten und schreibe sie als company_data
+    df_normalized = normalize_partner_data(df, enhanced_mode=enhanced_mode, inplace=True)
+    _save_normalized_company_data(con, df_normalized)
+    set_pipeline_fingerprint(con, "normalize", fingerprint)
+    n_records = con.execute("SELECT COUNT(*) FROM company_data").fetchone()[0]
     con.close()
-    return len(df_normalized)
+    return n_records
 
 
-def save_csv_input_data(csv_file_path, bewertung_path=None, n_dups=5000, n_nodups=5000, enhanced_mode=False):
+def save_csv_input_data(csv_file_path, bewertung_path=None, n_dups=5000, n_nodups=5000, enhanced_mode=False, force_refresh=False):
     """
     Liest die Input-CSV und speichert sie als company_data_raw in die Datenbank.
+    Ist die Datei seit dem letzten Import unverändert (Pfad, Änderungszeit, Größe), wird der Import übersprungen.
     Args:
         csv_file_path (str): Pfad zur Input-CSV
+        force_refresh (bool): Import auch bei unveränderter Datei erzwingen
     Returns:
         int: Anzahl der Datensätze in company_data_raw
     """
-    con = get_connection()
-    con.execute("DROP TABLE IF EXISTS company_data_raw")
-    con.execute(f"CREATE TABLE company_data_raw AS SELECT * FROM read_csv_auto('{csv_file_path}', sep=';')")
+    con = get_connection().cursor()
+    fingerprint = get_file_fingerprint(csv_file_path)
+    if force_refresh or not _table_exists(con, "company_data_raw") or get_pipeline_fingerprint(con, "load_data") != fingerprint:
+        # DuckDB liest die CSV direkt (parallel, ohne pandas); der Pfad wird als Parameter gebunden
+        con.execute("CREATE OR REPLACE TABLE company_data_raw AS SELECT * FROM read_csv_auto(?, sep=';')", [csv_file_path])
+        set_pipeline_fingerprint(con, "load_data", fingerprint)
     n_records = con.execute("SELECT COUNT(*) FROM company_data_raw").fetchone()[0]
     con.close()
     return n_records
@@ -124,15 +155,18 @@ def save_reference_duplicates_to_database(reference_file):
     Returns:
         int: Anzahl der Referenzpaare
     """
-    con = get_connection()
-    con.execute("DROP TABLE IF EXISTS reference_duplicates")
-    con.execute(f"CREATE TABLE reference_duplicates AS SELECT SATZNR_1 AS id1, SATZNR_2 AS id2 FROM read_csv_auto('{reference_file}', sep=';')")
+    con = get_connection().cursor()
+    # DuckDB liest nur die beiden ID-Spalten direkt aus der CSV; der Pfad wird als Parameter gebunden
+    con.execute(
+        "CREATE OR REPLACE TABLE reference_duplicates AS SELECT SATZNR_1 AS id1, SATZNR_2 AS id2 FROM read_csv_auto(?, sep=';')",
+        [reference_file],
+    )
     n_pairs = con.execute("SELECT COUNT(*) FROM reference_duplicates").fetchone()[0]
     con.close()
     return n_pairs
 
 
-def load_input_and_reference_data(input_path, reference_path, n_dups=5000, n_nodups=5000, enhanced_mode=False):
+def load_input_and_reference_data(input_path, reference_path, n_dups=5000, n_nodups=5000, enhanced_mode=False, force_refresh=False):
     """
     Lädt die Inputdaten und Referenzpaare, erstellt ein balanciertes Testset und speichert alles in die Datenbank.
     Args:
@@ -141,30 +175,41 @@ def load_input_and_reference_data(input_path, reference_path, n_dups=5000, n_nod
         n_dups (int): Anzahl Duplikat-Paare
         n_nodups (int): Anzahl Nicht-Duplikate
         enhanced_mode (bool): Erweiterte Normalisierung
+        force_refresh (bool): Import und Normalisierung auch bei unveränderten Eingaben erzwingen
     Returns:
         Tuple (n_balanced, n_refs): Anzahl balancierter Datensätze, Anzahl Referenzpaare
     """
-    # Zuerst Referenzpaare speichern
-    n_refs = save_reference_duplicates_to_database(reference_path)
-    # Inputdaten einlesen
-    n_records = save_csv_input_data(input_path)
+    # Referenzpaare und Inputdaten schreiben in verschiedene Tabellen und werden parallel eingelesen
+    # (jede Funktion arbeitet auf einem eigenen Cursor der gemeinsamen Verbindung)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        refs_future = executor.submit(save_reference_duplicates_to_database, reference_path)
+        records_future = executor.submit(save_csv_input_data, input_path, force_refresh=force_refresh)
+        n_refs = refs_future.result()
+        n_records = records_future.result()
     # Balanciertes Testset erzeugen und speichern
     # n_balanced = create_balanced_company_data(n_dups=n_dups, n_nodups=n_nodups, enhanced_mode=enhanced_mode)
-    n_balanced = create_company_data(n_rows=n_dups, enhanced_mode=enhanced_mode)
+    n_balanced = create_company_data(n_rows=n_dups, enhanced_mode=enhanced_mode, force_refresh=force_refresh)
     return n_balanced, n_refs
 
 
-def get_prediction_data():
+def _table_exists(con, table_name):
+    """Prüft, ob eine Tabelle in der Datenbank existiert."""
+    return con.execute(
+        "SELECT COUNT(*) FROM information_schema.tables WHERE table_name = ?", [table_name]
+    ).fetchone()[0] > 0
+
+
+def get_prediction_relation(con, table_name="company_data"):
     """
-    Get CSV input data from database.
+    Gibt company_data als DuckDB-Relation zurück, ohne die Daten nach pandas zu laden.
+    Args:
+        con: DuckDB-Verbindung
+        table_name (str): Name der Tabelle
     Returns:
-        pd.DataFrame or None: Normalized CSV data
+        duckdb.DuckDBPyRelation or None: Relation oder None, falls die Tabelle nicht existiert
     """
-    con = get_connection()
     try:
-        df = con.execute("SELECT * FROM company_data").df()
-        return df
-    except Exception:
+        return con.table(table_name)
+    except duckdb.CatalogException:
         return None
-    finally:
-        con.close()
+
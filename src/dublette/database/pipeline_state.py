@@ -0,0 +1,75 @@
+"""
+Persists fingerprints of expensive pipeline steps (training, prediction, ...) in DuckDB,
+so that a step can be skipped when its inputs have not changed since the last run.
+"""
+import hashlib
+import os
+
+import duckdb
+
+
+def get_table_fingerprint(con, table_name):
+    """
+    Berechnet einen Fingerprint über Schema, Zeilenanzahl und Inhalt einer Tabelle.
+    Args:
+        con: DuckDB-Verbindung
+        table_name (str): Name der Tabelle
+    Returns:
+        str or None: Fingerprint oder None, falls die Tabelle nicht existiert
+    """
+    try:
+        columns = con.execute(f"DESCRIBE {table_name}").fetchall()
+        n_rows, content_hash = con.execute(f"SELECT COUNT(*), SUM(hash(t)::HUGEINT) FROM {table_name} t").fetchone()
+    except duckdb.CatalogException:
+        return None
+    schema = ",".join(f"{c[0]}:{c[1]}" for c in columns)
+    return hashlib.blake2b(f"{schema}|{n_rows}|{content_hash}".encode(), digest_size=16).hexdigest()
+
+
+def get_file_fingerprint(path, *params):
+    """
+    Berechnet einen günstigen Fingerprint einer Eingabedatei über Pfad, Änderungszeit und Größe
+    (ohne den Inhalt zu lesen), optional ergänzt um Parameter des Verarbeitungsschritts.
+    Args:
+        path (str): Pfad zur Datei
+        *params: Zusätzliche Parameter, die in den Fingerprint eingehen
+    Returns:
+        str: Fingerprint
+    """
+    stat = os.stat(path)
+    key = "|".join(str(part) for part in (os.path.abspath(path), stat.st_mtime_ns, stat.st_size, *params))
+    return hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+
+
+def get_pipeline_fingerprint(con, step):
+    """
+    Liest den zuletzt gespeicherten Fingerprint eines Pipeline-Schritts.
+    Args:
+        con: DuckDB-Verbindung
+        step (str): Name des Schritts (z.B. 'train')
+    Returns:
+        str or None: Gespeicherter Fingerprint oder None
+    """
+    try:
+        row = con.execute("SELECT fingerprint FROM pipeline_state WHERE step = ?", [step]).fetchone()
+    except duckdb.CatalogException:
+        return None
+    return row[0] if row else None
+
+
+def set_pipeline_fingerprint(con, step, fingerprint):
+    """
+    Speichert den Fingerprint eines erfolgreich abgeschlossenen Pipeline-Schritts.
+    Args:
+        con: DuckDB-Verbindung
+        step (str): Name des Schritts (z.B. 'train')
+        fingerprint (str): Fingerprint der Eingaben des Schritts
+    """
+    con.execute("""
+        CREATE TABLE IF NOT EXISTS pipeline_state (
+            step VARCHAR PRIMARY KEY,
+            fingerprint VARCHAR,
+            updated_at TIMESTAMP
+        )
+    """)
+    con.execute("INSERT OR REPLACE INTO pipeline_state VALUES (?, ?, now())", [step, fingerprint])
@@ -1,5 +1,8 @@
 import duckdb
 # Standardbibliotheken
+import hashlib
+import json
+
 import pandas as pd
 
 # Splink-Module
@@ -10,12 +13,25 @@ from splink.blocking_analysis import (
 )
 from splink.exploratory import profile_columns
 
+from dublette.database.pipeline_state import get_pipeline_fingerprint, set_pipeline_fingerprint
+
 
-def create_prediction_reference_table(db_path, pred_table="predicted_duplicates", ref_table="reference_duplicates"):
+def create_prediction_reference_table(
+    con, pred_table="predicted_duplicates", ref_table="reference_duplicates", fingerprint=None
+):
     """
     Legt die Tabelle prediction_reference mit initialem Threshold an und befüllt sie.
+    con: DuckDB-Verbindung (z.B. die gemeinsame Verbindung der CLI)
+    fingerprint: Optionaler Fingerprint von Vorhersagen und Referenzdaten; stimmt er mit dem des letzten Aufbaus
+        überein und existiert die Tabelle noch, wird sie nicht neu erzeugt
+    Gibt True zurück, wenn die Tabelle neu aufgebaut wurde, sonst False.
     """
-    con = duckdb.connect(db_path)
+    if fingerprint is not None and get_pipeline_fingerprint(con, "prediction_reference") == fingerprint:
+        try:
+            con.execute("SELECT 1 FROM prediction_reference LIMIT 1")
+            return False
+        except duckdb.CatalogException:
+            pass
     con.execute(f"""
         CREATE OR REPLACE TABLE prediction_reference AS
         SELECT
@@ -27,50 +43,116 @@ def create_prediction_reference_table(db_path, pred_table="predicted_duplicates"
         LEFT JOIN {ref_table} r
         ON (p.SATZNR_l = r.id1 AND p.SATZNR_r = r.id2)
     """)
-    con.close()
+    if fingerprint is not None:
+        set_pipeline_fingerprint(con, "prediction_reference", fingerprint)
+    return True
 
-def evaluate_prediction_metrics(db_path, threshold=0.5, run_timestamp=None):
+def evaluate_prediction_metrics(con, threshold=0.5, run_timestamp=None):
     """
     Berechnet die Metriken (Confusion Matrix, Precision, Recall, F1) für die vorhandene prediction_reference-Tabelle mit neuem Threshold.
     Fügt die Ergebnisse in prediction_evaluation ein und gibt sie als Dict zurück.
     """
-    con = duckdb.connect(db_path)
-    # Confusion Matrix und Metriken direkt per SQL
-    sql_conf_matrix = f"""
+    return evaluate_prediction_metrics_for_thresholds(con, [threshold], run_timestamp=run_timestamp)[threshold]
+
+
+def evaluate_prediction_metrics_for_thresholds(con, thresholds, run_timestamp=None, cache_key=None):
+    """
+    Berechnet die Metriken (Confusion Matrix, Precision, Recall, F1) für mehrere Thresholds
+    in einem einzigen Scan über prediction_reference.
+    Fügt die Ergebnisse in prediction_evaluation ein.
+    Args:
+        con: DuckDB-Verbindung (z.B. die gemeinsame Verbindung der CLI)
+        thresholds (list[float]): Zu evaluierende Thresholds
+        run_timestamp (str): Optionaler Timestamp des Durchlaufs
+        cache_key (str): Optionaler Fingerprint von Vorhersagen und Referenzdaten; stimmt er (zusammen mit den
+            Thresholds) mit dem letzten Lauf überein, werden die Metriken aus metrics_cache gelesen statt neu berechnet
+    Returns:
+        dict: Threshold -> Dict mit Metriken und Confusion Matrix (Markdown)
+    """
+    # Doppelte Thresholds (z.B. 1.0 und 1) nur einmal evaluieren: im CROSS JOIN würde jeder doppelte
+    # Wert die Zellen der Confusion Matrix für diesen Threshold mehrfach zählen
+    unique_thresholds = list(dict.fromkeys(float(threshold) for threshold in thresholds))
+    if len(unique_thresholds) != len(thresholds):
+        print(f"⚠️  Doppelte Thresholds werden nur einmal evaluiert: {unique_thresholds}")
+    thresholds = unique_thresholds
+    if cache_key is not None:
+        cache_key = hashlib.blake2b(f"{cache_key}|{json.dumps(thresholds)}".encode(), digest_size=16).hexdigest()
+        results = _read_metrics_cache(con, cache_key)
+        if results is not None:
+            _insert_prediction_evaluation(con, run_timestamp, results)
+            return results
+    # Confusion Matrix aller Thresholds in einem Scan per SQL; die Metriken werden aus ihren Zellen abgeleitet
+    sql_conf_matrix = """
         SELECT
-            CASE WHEN match_probability >= {threshold} THEN 1 ELSE 0 END AS pred_label,
-            ref_label,
+            t.threshold,
+            CASE WHEN p.match_probability >= t.threshold THEN 1 ELSE 0 END AS pred_label,
+            p.ref_label,
             COUNT(*) AS count
-        FROM prediction_reference
-        GROUP BY pred_label, ref_label
+        FROM prediction_reference p
+        CROSS JOIN (SELECT UNNEST(?::DOUBLE[]) AS threshold) t
+        GROUP BY t.threshold, pred_label, p.ref_label
+        ORDER BY t.threshold, pred_label, p.ref_label
     """
-    # Confusion Matrix als Markdown-Tabelle
-    conf_matrix_rows = con.execute(sql_conf_matrix).fetchall()
-    conf_matrix_header = '| pred_label | ref_label | count |\n|---|---|---|'
-    conf_matrix_table = [conf_matrix_header]
-    for row in conf_matrix_rows:
-        conf_matrix_table.append(f'| {row[0]} | {row[1]} | {row[2]} |')
-    conf_matrix_md = '\n'.join(conf_matrix_table)
-    # Metriken direkt per SQL
-    sql_metrics = f"""
-        SELECT
-            SUM(CASE WHEN pred_label = 1 AND ref_label = 1 THEN 1 ELSE 0 END) AS tp,
-            SUM(CASE WHEN pred_label = 1 AND ref_label = 0 THEN 1 ELSE 0 END) AS fp,
-            SUM(CASE WHEN pred_label = 0 AND ref_label = 1 THEN 1 ELSE 0 END) AS fn,
-            SUM(CASE WHEN pred_label = 0 AND ref_label = 0 THEN 1 ELSE 0 END) AS tn
-        FROM (
-            SELECT CASE WHEN match_probability >= {threshold} THEN 1 ELSE 0 END AS pred_label, ref_label FROM prediction_reference
+    conf_matrix_rows = con.execute(sql_conf_matrix, [thresholds]).fetchall()
+    results = {}
+    for threshold in thresholds:
+        rows = [row[1:] for row in conf_matrix_rows if row[0] == threshold]
+        # Confusion Matrix als Markdown-Tabelle
+        conf_matrix_header = '| pred_label | ref_label | count |\n|---|---|---|'
+        conf_matrix_table = [conf_matrix_header]
+        for row in rows:
+            conf_matrix_table.append(f'| {row[0]} | {row[1]} | {row[2]} |')
+        conf_matrix_md = '\n'.join(conf_matrix_table)
+        # Metriken aus den Zellen der Confusion Matrix
+        counts = {(pred_label, ref_label): count for pred_label, ref_label, count in rows}
+        tp = counts.get((1, 1), 0)
+        fp = counts.get((1, 0), 0)
+        fn = counts.get((0, 1), 0)
+        tn = counts.get((0, 0), 0)
+        precision = tp / (tp + fp) if (tp + fp) else 0
+        recall = tp / (tp + fn) if (tp + fn) else 0
+        f1 = 2 * precision * recall / (precision + recall) if (precision + recall) else 0
+        results[threshold] = {
+            "true_positives": tp,
+            "false_positives": fp,
+            "false_negatives": fn,
+            "true_negatives": tn,
+            "precision": precision,
+            "recall": recall,
+            "f1_score": f1,
+            "confusion_matrix": conf_matrix_md
+        }
+    _insert_prediction_evaluation(con, run_timestamp, results)
+    if cache_key is not None:
+        con.execute(
+            "CREATE OR REPLACE TABLE metrics_cache AS SELECT ?::VARCHAR AS cache_key, ?::VARCHAR AS metrics_json",
+            [cache_key, json.dumps(list(results.items()))],
         )
+    return results
+
+
+def _read_metrics_cache(con, cache_key):
+    """
+    Liest die zwischengespeicherten Metriken zu cache_key aus metrics_cache.
+    Returns:
+        dict or None: Threshold -> Metriken oder None, falls kein passender Eintrag existiert
+    """
+    try:
+        row = con.execute("SELECT metrics_json FROM metrics_cache WHERE cache_key = ?", [cache_key]).fetchone()
+    except duckdb.CatalogException:
+        return None
+    return {threshold: metrics for threshold, metrics in json.loads(row[0])} if row else None
+
+
+def _insert_prediction_evaluation(con, run_timestamp, results):
+    """
+    Hängt die Metriken eines Durchlaufs (ein Eintrag pro Threshold) an prediction_evaluation an.
     """
-    tp, fp, fn, tn = con.execute(sql_metrics).fetchone()
-    precision = tp / (tp + fp) if (tp + fp) else 0
-    recall = tp / (tp + fn) if (tp + fn) else 0
-    f1 = 2 * precision * recall / (precision + recall) if (precision + recall) else 0
     # Timestamp setzen
     import datetime
     ts = run_timestamp if run_timestamp is not None else datetime.datetime.now().isoformat()
     # Ergebnisse als Tabelle speichern (append, timestamp und threshold als Spalte)
-    con.execute(f"""
+    con.execute("""
         CREATE TABLE IF NOT EXISTS prediction_evaluation (
             run_timestamp VARCHAR,
             threshold DOUBLE,
@@ -81,57 +163,61 @@ def evaluate_prediction_metrics(db_path, threshold=0.5, run_timestamp=None):
             precision DOUBLE,
             recall DOUBLE,
             f1_score DOUBLE
-        );
-        INSERT INTO prediction_evaluation VALUES (
-            '{ts}',
-            {threshold},
-            {tp},
-            {fp},
-            {fn},
-            {tn},
-            {precision},
-            {recall},
-            {f1}
-        );
+        )
     """)
-    con.close()
-    return {
-        "true_positives": tp,
-        "false_positives": fp,
-        "false_negatives": fn,
-        "true_negatives": tn,
-        "precision": precision,
-        "recall": recall,
-        "f1_score": f1,
-        "confusion_matrix": conf_matrix_md
-    }
-
-
-def blocking_rule_stats(df, blocking_rules, link_type="dedupe_only", verbose=True):
+    con.executemany(
+        "INSERT INTO prediction_evaluation VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [
+            [ts, threshold, r["true_positives"], r["false_positives"], r["false_negatives"], r["true_negatives"],
+             r["precision"], r["recall"], r["f1_score"]]
+            for threshold, r in results.items()
+        ],
+    )
+
+
+def blocking_rule_stats(
+    table_or_df,
+    blocking_rules,
+    link_type="dedupe_only",
+    verbose=True,
+    db_api=None,
+    unique_id_column_name="unique_id",
+    compute_post_filter_count=False,
+    scored_pair_counts=None,
+):
     """
     Gibt für eine oder mehrere Blocking Rules die Anzahl der Vergleichspaare als Dict zurück.
-    Erwartet immer ein DataFrame als ersten Parameter.
     Optional: Gibt die Ergebnisse direkt auf der Konsole aus (verbose=True).
-    df: DataFrame mit den zu analysierenden Daten
+    table_or_df: DataFrame oder Tabellenname (dann mit db_api auf der zugehörigen DuckDB-Verbindung)
     blocking_rules: Liste von Blocking Rules (oder einzelne Rule als String)
+    db_api: Optional, DuckDBAPI (Standard: neue In-Memory-Datenbank)
+    unique_id_column_name: Name der ID-Spalte
+    compute_post_filter_count: Zusätzlich die Paare nach Filterbedingungen zählen. Dafür muss Splink alle Paare
+        erzeugen; standardmäßig wird nur die Anzahl vor Filterbedingungen per Aggregat über die Blockgrößen berechnet.
+    scored_pair_counts: Optional, je Rule (gleiche Reihenfolge) bereits per Aggregat gezählte Paare nach Filterbedingungen,
+        z.B. aus count_scored_block_pairs; ersetzt dann Splinks "not computed" ohne Paare zu erzeugen.
     """
     if not isinstance(blocking_rules, (list, tuple)):
         blocking_rules = [blocking_rules]
 
-    db_api = DuckDBAPI()
+    db_api = db_api or DuckDBAPI()
     results = {}
-    for rule in blocking_rules:
+    for i, rule in enumerate(blocking_rules):
         details = {}
-        if not isinstance(df, pd.DataFrame):
-            details["Vergleiche"] = "Fehler: Erwartet DataFrame als Input."
+        if not isinstance(table_or_df, (pd.DataFrame, str)):
+            details["Vergleiche"] = "Fehler: Erwartet DataFrame oder Tabellenname als Input."
         else:
             try:
                 n_comparisons = count_comparisons_from_blocking_rule(
-                    table_or_tables=df,
+                    table_or_tables=table_or_df,
                     blocking_rule=rule,
                     link_type=link_type,
                     db_api=db_api,
+                    unique_id_column_name=unique_id_column_name,
+                    compute_post_filter_count=compute_post_filter_count,
                 )
+                if scored_pair_counts is not None and isinstance(n_comparisons, dict):
+                    n_comparisons["number_of_comparisons_to_be_scored_post_filter_conditions"] = scored_pair_counts[i]
                 details["Vergleiche"] = n_comparisons
             except Exception as e:
                 details["Vergleiche"] = f"Fehler: {e}"
@@ -150,30 +236,39 @@ def get_linker_comparison_details(linker):
         return []
 
 
-def cumulative_comparisons_chart(df, blocking_rules, output_path="output/cumulative_comparisons_chart.png"):
+def cumulative_comparisons_chart(
+    table_or_df,
+    blocking_rules,
+    output_path="output/cumulative_comparisons_chart.png",
+    db_api=None,
+    unique_id_column_name="unique_id",
+):
     """
     Generiert ein Chart mit der kumulierten Anzahl der zu bewertenden Vergleichspaare für mehrere Blocking Rules.
     Speichert die Grafik als PNG.
     """
-    db_api = DuckDBAPI()
+    db_api = db_api or DuckDBAPI()
     print("📊 Cumulative Comparisons Chart")
     chart = cumulative_comparisons_to_be_scored_from_blocking_rules_chart(
-        table_or_tables=df,
+        table_or_tables=table_or_df,
         blocking_rules=blocking_rules,
         db_api=db_api,
         link_type="dedupe_only",
+        unique_id_column_name=unique_id_column_name,
     )
     chart.save(output_path, format="png")
 
 
-def custom_column_profile(df, column_expressions, output_path="output/custom_column_profile_chart.png"):
+def custom_column_profile(
+    table_or_df, column_expressions, output_path="output/custom_column_profile_chart.png", db_api=None
+):
     """
     Generiert ein Profil-Chart für benutzerdefinierte Spaltenausdrücke.
     Speichert die Grafik als PNG.
     """
-    db_api = DuckDBAPI()
+    db_api = db_api or DuckDBAPI()
     print(f"📊 Custom Column Profile: {column_expressions}")
-    chart = profile_columns(df, column_expressions=column_expressions, db_api=db_api)
+    chart = profile_columns(table_or_df, column_expressions=column_expressions, db_api=db_api)
     chart.save(output_path, format="png")
 
 
@@ -252,6 +347,21 @@ def append_to_markdown_report(content, output_path="output/estimating_model_para
     content: Dict oder String, das angehängt werden soll.
     section_title: Optionaler Abschnittstitel für die neuen Erkenntnisse.
     """
+    append_sections_to_markdown_report([(section_title, content)], output_path=output_path)
+
+
+def append_sections_to_markdown_report(sections, output_path="output/estimating_model_parameter.md"):
+    """
+    Hängt mehrere Abschnitte mit einem einzigen Schreibvorgang ans Ende der Markdown-Datei an.
+    sections: Liste von (section_title, content); content ist Dict oder String, section_title optional (None).
+    """
+    parts = [_markdown_section(content, section_title) for section_title, content in sections]
+    with open(output_path, "a") as f:
+        f.write("".join(parts))
+
+
+def _markdown_section(content, section_title=None):
+    """Formatiert einen Abschnitt (Titel + Dict als Tabelle oder String) für den Markdown-Report."""
     lines = []
     if section_title:
         lines.append(f"\n## {section_title}\n")
@@ -262,5 +372,4 @@ def append_to_markdown_report(content, output_path="output/estimating_model_para
         lines.append("")
     else:
         lines.append(str(content))
-    with open(output_path, "a") as f:
-        f.write("\n".join(lines))
+    return "\n".join(lines)
@@ -1,18 +1,133 @@
 
 
+import copy
+import json
+from functools import lru_cache
+
 from splink import DuckDBAPI, Linker
 from splink.settings import SettingsCreator
 from splink import comparison_level_library as cll
 from splink.internals import comparison_library as cl
+from splink.internals import blocking_rule_library as brl
 from splink.internals.blocking_rule_library import block_on
 
 
+# Spaltenkombinationen der Blocking Rules für die Vorhersage
+BLOCKING_RULE_COLUMNS = [
+    ("NAME", "VORNAME"),
+    ("NAME", "POSTLEITZAHL"),
+    ("NAME", "VORNAME", "GEBURTSDATUM"),
+    ("NAME", "VORNAME", "GEBURTSDATUM", "POSTLEITZAHL"),
+    ("NAME", "VORNAME", "POSTLEITZAHL", "ADRESSZEILE"),
+    ("NAME", "VORNAME", "ORT", "ADRESSZEILE"),
+]
+
+
+# Präfix der vorberechneten Blockgrößen-Spalten (siehe create_block_size_view)
+BLOCK_SIZE_COLUMN_PREFIX = "block_size__"
+
+
+def block_size_column(columns):
+    """Name der Spalte mit der Blockgröße für eine Spaltenkombination, z.B. block_size__NAME__VORNAME."""
+    return BLOCK_SIZE_COLUMN_PREFIX + "__".join(columns)
+
+
+def block_on_with_size_guard(columns, max_block_size=None):
+    """
+    Blocking Rule auf den angegebenen Spalten. Mit max_block_size werden Blöcke verworfen,
+    die mehr als max_block_size Datensätze enthalten (z.B. sehr häufige Namen), da sie
+    quadratisch viele Vergleichspaare erzeugen.
+    Die Blockgröße liest die Regel aus einer vorberechneten Spalte (create_block_size_view); da beide
+    Datensätze eines Paars im selben Block liegen, genügt die Prüfung auf l. und die Regel bleibt
+    für Splink gültig (nur l./r.-Referenzen, kein Tabellenname im gespeicherten Modell).
+    """
+    rule = block_on(*columns)
+    if max_block_size is None:
+        return rule
+    guard = brl.CustomRule(f'l."{block_size_column(columns)}" <= {int(max_block_size)}')
+    return brl.And(rule, guard)
+
+
+def create_block_size_view(connection, table_name="company_data"):
+    """
+    Legt eine View an, die table_name um die Blockgröße jeder Blocking Rule ergänzt
+    (COUNT(*) OVER (PARTITION BY ...)), und gibt ihren Namen zurück.
+    Als View bleibt sie automatisch aktuell, wenn table_name neu geschrieben wird.
+    """
+    view_name = f"{table_name}_block_sizes"
+    block_sizes = []
+    for columns in BLOCKING_RULE_COLUMNS:
+        cols = ", ".join(f'"{c}"' for c in columns)
+        block_sizes.append(f'COUNT(*) OVER (PARTITION BY {cols}) AS "{block_size_column(columns)}"')
+    connection.execute(f"CREATE OR REPLACE VIEW {view_name} AS SELECT *, {', '.join(block_sizes)} FROM {table_name}")
+    return view_name
+
+
+def uses_block_size_guard(settings):
+    """Prüft, ob die Blocking Rules eines Settings-Dicts vorberechnete Blockgrößen-Spalten verwenden."""
+    rules = [
+        # Frisch erzeugte Settings enthalten Rule-Objekte, gespeicherte Modelle bereits Dicts
+        rule.create_blocking_rule_dict("duckdb") if hasattr(rule, "create_blocking_rule_dict") else rule
+        for rule in settings.get("blocking_rules_to_generate_predictions", [])
+    ]
+    return BLOCK_SIZE_COLUMN_PREFIX in json.dumps(rules, default=str)
+
+
+def _sum_block_pairs(connection, table_name, columns, having="", params=()):
+    """Summiert g*(g-1)/2 über alle Blöcke (Größe g) einer Spaltenkombination ohne NULL-Schlüssel."""
+    cols = ", ".join(f'"{c}"' for c in columns)
+    not_null = " AND ".join(f'"{c}" IS NOT NULL' for c in columns)
+    return connection.execute(f"""
+        SELECT COALESCE(SUM(block_size * (block_size - 1) // 2), 0)
+        FROM (
+            SELECT COUNT(*) AS block_size
+            FROM {table_name}
+            WHERE {not_null}
+            GROUP BY {cols}
+            {having}
+        )
+    """, list(params)).fetchone()[0]
+
+
+def count_oversized_block_pairs(connection, table_name="company_data", max_block_size=1000):
+    """
+    Zählt je Blocking Rule die Vergleichspaare, die durch max_block_size verworfen werden.
+    Gibt ein Dict {Spaltenkombination: Anzahl verworfener Paare} zurück.
+    """
+    return {
+        "+".join(columns): _sum_block_pairs(connection, table_name, columns, "HAVING COUNT(*) > ?", [max_block_size])
+        for columns in BLOCKING_RULE_COLUMNS
+    }
+
+
+def count_scored_block_pairs(connection, table_name="company_data", max_block_size=None):
+    """
+    Zählt je Blocking Rule die Vergleichspaare, die Splink tatsächlich bewertet (jedes Paar einmal, l.id < r.id),
+    per Aggregat über die Blockgrößen statt durch Erzeugen der Paare; mit max_block_size ohne verworfene Blöcke.
+    Gibt ein Dict {Spaltenkombination: Anzahl Paare} in der Reihenfolge der Blocking Rules zurück.
+    """
+    having, params = ("HAVING COUNT(*) <= ?", [max_block_size]) if max_block_size is not None else ("", [])
+    return {
+        "+".join(columns): _sum_block_pairs(connection, table_name, columns, having, params)
+        for columns in BLOCKING_RULE_COLUMNS
+    }
 
-def get_splink_settings():
+
+def get_splink_settings(table_name="company_data", max_block_size=None, debug=False):
     """
     Gibt die Splink-Settings für einen minimalen Start zurück (nur NAME),
     jetzt mit SettingsCreator im Stil des Beispiels.
+    Optional: max_block_size begrenzt die Blockgröße aller Blocking Rules.
+    Optional: debug behält die Zwischenspalten (gamma_*, bf_*, tf_*) im Ergebnis;
+    ohne debug bleiben die Vergleichstabellen deutlich schmaler.
+    Die Settings werden pro Parameterkombination nur einmal aufgebaut; zurückgegeben wird jeweils eine Kopie,
+    damit Änderungen des Aufrufers den Cache nicht verfälschen.
     """
+    return copy.deepcopy(_build_splink_settings(table_name, max_block_size, debug))
+
+
+@lru_cache(maxsize=8)
+def _build_splink_settings(table_name, max_block_size, debug):
     settings = SettingsCreator(
         link_type="dedupe_only",
         unique_id_column_name="SATZNR",
@@ -34,27 +149,40 @@ def get_splink_settings():
             cl.LevenshteinAtThresholds("ORT", distance_threshold_or_thresholds=[1, 2]),
         ],
         blocking_rules_to_generate_predictions=[
-            block_on("NAME", "VORNAME"),
-            block_on("NAME", "POSTLEITZAHL"),
-            block_on("NAME", "VORNAME", "GEBURTSDATUM"),
-            block_on("NAME", "VORNAME", "GEBURTSDATUM", "POSTLEITZAHL"),
-            block_on("NAME", "VORNAME", "POSTLEITZAHL", "ADRESSZEILE"),
-            block_on("NAME", "VORNAME", "ORT", "ADRESSZEILE"),
+            block_on_with_size_guard(columns, max_block_size=max_block_size)
+            for columns in BLOCKING_RULE_COLUMNS
         ],
-        retain_intermediate_calculation_columns=True,
+        retain_intermediate_calculation_columns=debug,
         em_convergence=0.0001,
         max_iterations=30,
     )
     return settings.settings_dict()
 
 
-def create_duckdb_linker(table_name="company_data", connection=None):
+def create_duckdb_linker(table_name="company_data", connection=None, settings=None, max_block_size=None, debug=False):
     """
     Erstellt und gibt einen Splink DuckDB-Linker für eine Tabelle zurück.
     table_name: Name der DuckDB-Tabelle (str)
     connection: Optional, bestehende DuckDB-Verbindung
+    settings: Optional, Settings-Dict oder Pfad zu einem gespeicherten Modell (JSON)
+    max_block_size: Optional, maximale Blockgröße der Blocking Rules (nur ohne settings)
+    debug: Optional, Zwischenspalten im Ergebnis behalten (gilt auch für gespeicherte Modelle)
     """
-    settings = get_splink_settings()
+    if settings is None:
+        settings = get_splink_settings(table_name=table_name, max_block_size=max_block_size, debug=debug)
+    else:
+        # Bei gespeicherten Modellen gilt debug des aktuellen Aufrufs, nicht der Stand beim Training
+        if isinstance(settings, str):
+            with open(settings, encoding="utf-8") as f:
+                settings = json.load(f)
+        else:
+            settings = copy.deepcopy(settings)
+        settings["retain_intermediate_calculation_columns"] = debug
+        # Matching-Spalten (NAME_l, NAME_r, ...) gehören immer ins Ergebnis, auch bei älteren Modelldateien
+        settings["retain_matching_columns"] = True
+    # Blocking Rules mit Blockgrößen-Begrenzung lesen die vorberechneten Blockgrößen aus einer View
+    if connection is not None and uses_block_size_guard(settings):
+        table_name = create_block_size_view(connection, table_name)
     db_api = DuckDBAPI(connection=connection) if connection else DuckDBAPI()
     linker = Linker(table_name, settings, db_api=db_api)
     return linker
@@ -1,7 +1,12 @@
+import hashlib
+import json
+import os
+
 from splink import Linker
 from splink.internals import blocking_rule_library as brl
 from dublette.database.connection import get_connection
-from dublette.model.linker_settings import create_duckdb_linker
+from dublette.database.pipeline_state import get_pipeline_fingerprint, get_table_fingerprint, set_pipeline_fingerprint
+from dublette.model.linker_settings import BLOCK_SIZE_COLUMN_PREFIX, create_duckdb_linker
 
 
 
@@ -9,29 +14,117 @@ def train_splink_model(linker, blocking_rules, max_pairs=5000, smoothing_value=1
     """
     Führt das Training (EM) für das Splink-Modell durch.
     Nutzt die übergebenen Blocking Rules.
+    Die EM-Iterationen laufen ohne Term-Frequency-Anpassungen: Splink rechnet dann nur auf den
+    aggregierten Agreement-Pattern-Counts statt auf jedem einzelnen Vergleichspaar.
+    Die TF-Anpassungen werden bei der Vorhersage weiterhin angewendet.
     """
     linker.training.estimate_u_using_random_sampling(max_pairs=max_pairs)
     for blocking_rule in blocking_rules:
         try:
             linker.training.estimate_parameters_using_expectation_maximisation(
-                blocking_rule, smoothing_value=smoothing_value
+                blocking_rule, estimate_without_term_frequencies=True, smoothing_value=smoothing_value
             )
         except TypeError:
-            linker.training.estimate_parameters_using_expectation_maximisation(blocking_rule)
+            linker.training.estimate_parameters_using_expectation_maximisation(
+                blocking_rule, estimate_without_term_frequencies=True
+            )
     return linker
 
 
+def get_training_fingerprint(linker, connection, table_name="company_data", max_pairs=5000):
+    """
+    Bildet einen Fingerprint aus Eingabetabelle, (untrainierten) Modell-Settings und Trainingsparametern.
+    Ändert sich keiner davon, liefert ein erneutes Training dasselbe Modell.
+    """
+    model_dict = linker.misc.save_model_to_json()
+    # linker_uid wird pro Linker-Instanz zufällig vergeben und gehört nicht zum Modell
+    model_dict.pop("linker_uid", None)
+    # Welche Spalten im Ergebnis behalten werden, beeinflusst das Training nicht
+    model_dict.pop("retain_intermediate_calculation_columns", None)
+    model_dict.pop("retain_matching_columns", None)
+    settings_json = json.dumps(model_dict, sort_keys=True, default=str)
+    key = f"{get_table_fingerprint(connection, table_name)}|{settings_json}|{max_pairs}"
+    return hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+
+
+def train_or_load_splink_model(
+    linker, connection, blocking_rules, model_path, table_name="company_data", max_pairs=5000, retrain=False, debug=False
+):
+    """
+    Trainiert das Splink-Modell oder lädt das gespeicherte Modell, falls sich Eingabedaten und Settings
+    seit dem letzten Training nicht geändert haben (Fingerprint in pipeline_state).
+    Gibt (linker, trained) zurück; trained ist False, wenn das gespeicherte Modell verwendet wurde.
+    debug wird auch auf ein geladenes Modell angewendet (Zwischenspalten im Ergebnis behalten).
+    """
+    fingerprint = get_training_fingerprint(linker, connection, table_name=table_name, max_pairs=max_pairs)
+    if not retrain and os.path.exists(model_path) and get_pipeline_fingerprint(connection, "train") == fingerprint:
+        return create_duckdb_linker(table_name=table_name, connection=connection, settings=model_path, debug=debug), False
+
+    train_splink_model(linker, blocking_rules, max_pairs=max_pairs)
+    linker.misc.save_model_to_json(model_path, overwrite=True)
+    set_pipeline_fingerprint(connection, "train", fingerprint)
+    return linker, True
+
+
+def get_prediction_fingerprint(linker, connection, table_name="company_data", threshold_match_probability=0.3):
+    """
+    Bildet einen Fingerprint aus Eingabetabelle, (trainiertem) Modell und Vorhersage-Threshold.
+    Ändert sich keiner davon, liefert eine erneute Vorhersage dieselben Ergebnisse.
+    """
+    model_dict = linker.misc.save_model_to_json()
+    model_dict.pop("linker_uid", None)
+    # comparison_description ändert sich beim Laden aus JSON (z.B. NameComparison -> CustomComparison),
+    # gehört aber nicht zum Modell; sonst verfehlt das erste --predict nach einem Training den Cache
+    for comparison in model_dict.get("comparisons", []):
+        comparison.pop("comparison_description", None)
+    model_json = json.dumps(model_dict, sort_keys=True, default=str)
+    key = f"{get_table_fingerprint(connection, table_name)}|{model_json}|{threshold_match_probability}"
+    return hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+
+
+def predict_or_reuse_predictions(
+    linker,
+    connection,
+    table_name="company_data",
+    output_table="predicted_duplicates",
+    threshold_match_probability=0.3,
+    force_refresh=False,
+):
+    """
+    Führt die Splink-Vorhersage aus oder verwendet die vorhandene Ergebnistabelle weiter, falls sich
+    Eingabedaten, Modell und Threshold seit der letzten Vorhersage nicht geändert haben (Fingerprint in pipeline_state).
+    Gibt True zurück, wenn neu vorhergesagt wurde, sonst False.
+    """
+    fingerprint = get_prediction_fingerprint(
+        linker, connection, table_name=table_name, threshold_match_probability=threshold_match_probability
+    )
+    output_exists = connection.execute(
+        "SELECT COUNT(*) FROM information_schema.tables WHERE table_name = ?", [output_table]
+    ).fetchone()[0]
+    if not force_refresh and output_exists and get_pipeline_fingerprint(connection, "predict") == fingerprint:
+        return False
+
+    run_splink_predict(
+        linker, connection, output_table=output_table, threshold_match_probability=threshold_match_probability
+    )
+    set_pipeline_fingerprint(connection, "predict", fingerprint)
+    return True
+
+
 import duckdb
 
 def run_splink_predict(linker, connection, output_table="predicted_duplicates", threshold_match_probability=0.3):
     """
     Führt die Dubletten-Vorhersage mit einem bestehenden Splink-Linker durch und speichert die Ergebnisse als Tabelle in DuckDB.
-    Gibt das Ergebnis-DataFrame zurück.
+    Der Linker muss auf derselben Verbindung arbeiten: die Ergebnisse werden direkt aus Splinks
+    Ergebnistabelle kopiert, ohne Umweg über pandas.
+    Gibt das Splink-Ergebnis (SplinkDataFrame) zurück.
     """
     predictions = linker.inference.predict(threshold_match_probability=threshold_match_probability)
-    df_pred = predictions.as_pandas_dataframe()
-    # DataFrame als temporäre View registrieren und als Tabelle speichern
-    connection.register('df_pred', df_pred)
-    connection.execute(f"CREATE OR REPLACE TABLE {output_table} AS SELECT * FROM df_pred")
-    return df_pred
+    # Die Blockgrößen-Spalten der --max-block-size-Regeln sind nur Hilfsspalten fürs Blocking
+    connection.execute(
+        f"CREATE OR REPLACE TABLE {output_table} AS "
+        f"SELECT COLUMNS(c -> NOT starts_with(c, '{BLOCK_SIZE_COLUMN_PREFIX}')) FROM {predictions.physical_name}"
+    )
+    return predictions
 